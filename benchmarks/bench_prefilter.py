@@ -0,0 +1,44 @@
+"""Throughput of the rule checking with and without the trigger prefilter.
+
+The input is clean (already formatted) code, which is the common case.
+
+    PYTHONPATH=. python benchmarks/bench_prefilter.py [--repeat N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from fortran_linter.main import LineChecker
+
+HERE = Path(__file__).parent
+REFERENCE = HERE.parent / "tests" / "test_reference.f90"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    # Lint the reference file once, so that the benchmarked input is clean
+    lines = LineChecker(str(REFERENCE)).corrected_lines
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "clean.f90")
+        with open(fname, "w") as f:
+            f.writelines(_.rstrip() + "\n" for _ in lines * args.repeat)
+        nlines = len(lines) * args.repeat
+
+        for prefilter in (False, True):
+            tstart = time.perf_counter()
+            LineChecker(fname, prefilter=prefilter)
+            elapsed = time.perf_counter() - tstart
+            print(
+                f"prefilter={prefilter!s:<5} {nlines / elapsed:12.0f} lines/s "
+                f"({elapsed:.3f}s for {nlines} lines)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Per-file setup cost of :class:`fortran_linter.LineChecker`.
+
+Compare building the rules for every file (the historical behaviour) with the
+shared, per-process registry used by default.
+
+    PYTHONPATH=. python benchmarks/bench_setup.py [--number N]
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+
+from fortran_linter.main import FortranRules, Indenter, LineChecker, get_rules
+
+SOURCE = """\
+program main
+    implicit none
+    integer :: i
+    do i = 1, 10
+        print *, i
+    end do
+end program main
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "small.f90")
+        with open(fname, "w") as f:
+            f.write(SOURCE)
+
+        timings = {
+            "rules (fresh)": lambda: (FortranRules(linelen=120), Indenter(4)),
+            "rules (shared)": lambda: (get_rules(120), Indenter(4)),
+            "checker (fresh rules)": lambda: LineChecker(
+                fname, rules=FortranRules(linelen=120)
+            ),
+            "checker (shared rules)": lambda: LineChecker(fname),
+        }
+        for name, func in timings.items():
+            t = timeit.timeit(func, number=args.number) / args.number
+            print(f"{name:<24} {t * 1e6:10.1f} us/file")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Deterministic generator of realistic Fortran modules, to benchmark the linter.
+
+The modules mix clean and badly formatted code: nested ``do``/``if`` blocks,
+continuation lines, OpenMP directives, strings containing ``!``, labels,
+old-style operators and missing spaces. The same seed always yields the
+same files.
+
+    python benchmarks/corpus.py OUTDIR [--files N] [--lines N] [--seed S]
+"""
+
+import argparse
+import os
+import random
+
+TYPES = ["real(dp)", "integer", "logical", "character(len=32)", "REAL*8", "integer*4"]
+NAMES = ["rho", "vel", "pres", "ncell", "ilevel", "dx", "scale", "xp", "ok", "ind"]
+OPERATORS = ["+", "-", "*", "/", ".eq.", ".lt.", "==", "<=", ".and.", ".or."]
+
+
+class _ModuleGenerator:
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.lines: list[str] = []
+        self.label = 100
+
+    def name(self) -> str:
+        return self.rng.choice(NAMES) + str(self.rng.randrange(4))
+
+    def expr(self, depth: int = 0) -> str:
+        rng = self.rng
+        if depth > 1 or rng.random() < 0.4:
+            return rng.choice([self.name(), str(rng.randrange(100)), "1.0d-5"])
+        op = rng.choice(OPERATORS)
+        left, right = self.expr(depth + 1), self.expr(depth + 1)
+        if rng.random() < 0.3:
+            return f"{left}{op}{right}"  # missing spaces
+        return f"({left} {op} {right})"
+
+    def emit(self, indent: int, text: str) -> None:
+        # Indentation is often wrong, the linter fixes it
+        if self.rng.random() < 0.2:
+            indent = self.rng.randrange(6)
+        self.lines.append(" " * (2 * indent) + text + "\n")
+
+    def statement(self, indent: int) -> None:
+        rng = self.rng
+        kind = rng.random()
+        if kind < 0.35:
+            sep = "=" if rng.random() < 0.3 else " = "
+            self.emit(indent, f"{self.name()}{sep}{self.expr()}")
+        elif kind < 0.45:
+            # Continuation lines
+            self.emit(indent, f"{self.name()} = {self.expr()} + &")
+            self.emit(indent + 2, f"& {self.expr()} * &")
+            self.emit(indent + 2, f"& {self.expr()}")
+        elif kind < 0.55:
+            self.emit(indent, f"print*,'done! ilevel=', {self.name()}  ! comment")
+        elif kind < 0.62:
+            self.emit(
+                indent, f"write(*,*) \"a string with ! and 'quotes'\", {self.name()}"
+            )
+        elif kind < 0.68:
+            self.emit(indent, f"call update_{self.name()}({self.name()},{self.expr()})")
+        elif kind < 0.74:
+            self.emit(
+                indent, f"! {rng.choice(['Compute', 'Update', 'Check'])} the flux"
+            )
+        elif kind < 0.78:
+            self.emit(indent, f"{self.name()} = omp_get_thread_num()")
+        elif kind < 0.82:
+            self.emit(indent, f"if({self.expr()}) goto {self.label}")
+            self.emit(0, f"{self.label} continue")
+            self.label += 10
+        elif kind < 0.86:
+            self.emit(indent, f"{self.name()} = {self.name()};")
+        else:
+            self.emit(indent, f"{self.name()} = {self.expr()}  ")
+
+    def block(self, indent: int, depth: int) -> None:
+        rng = self.rng
+        for _ in range(rng.randrange(2, 6)):
+            kind = rng.random()
+            if depth < 3 and kind < 0.25:
+                var = rng.choice("ijk")
+                if rng.random() < 0.3:
+                    self.emit(indent, "!$omp parallel do private(i, j)")
+                self.emit(indent, f"do {var}=1,{self.name()}")
+                self.block(indent + 1, depth + 1)
+                self.emit(indent, rng.choice(["end do", "enddo"]))
+            elif depth < 3 and kind < 0.45:
+                self.emit(indent, f"if ({self.expr()}) then")
+                self.block(indent + 1, depth + 1)
+                if rng.random() < 0.5:
+                    self.emit(indent, "else")
+                    self.block(indent + 1, depth + 1)
+                self.emit(indent, rng.choice(["end if", "endif"]))
+            else:
+                self.statement(indent)
+
+    def routine(self, index: int) -> None:
+        rng = self.rng
+        kind = rng.choice(["subroutine", "function"])
+        args = ",".join(self.name() for _ in range(rng.randrange(1, 4)))
+        self.emit(1, f"{kind} routine_{index}({args})")
+        for _ in range(rng.randrange(1, 4)):
+            sep = "::" if rng.random() < 0.3 else " :: "
+            self.emit(2, f"{rng.choice(TYPES)}{sep}{self.name()}")
+        self.block(2, 0)
+        self.emit(1, f"end {kind} routine_{index}")
+        self.emit(0, "")
+
+
+def generate_module(seed: int, nlines: int = 500) -> str:
+    """Return the source of a module with about ``nlines`` lines."""
+    gen = _ModuleGenerator(random.Random(seed))  # noqa: S311
+    gen.lines.append(f"module generated_{seed}\n")
+    gen.lines.append("  use iso_fortran_env\n")
+    gen.lines.append("  implicit none\n")
+    gen.lines.append("contains\n")
+    index = 0
+    while len(gen.lines) < nlines:
+        gen.routine(index)
+        index += 1
+    gen.lines.append(f"end module generated_{seed}\n")
+    return "".join(gen.lines)
+
+
+def write_corpus(
+    directory: str, nfiles: int, nlines: int = 500, seed: int = 0
+) -> list[str]:
+    """Write ``nfiles`` modules to ``directory``, returning their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(nfiles):
+        path = os.path.join(directory, f"module_{i:05d}.f90")
+        with open(path, "w") as f:
+            f.write(generate_module(seed + i, nlines))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("outdir")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--lines", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_corpus(args.outdir, args.files, args.lines, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Benchmark suite of the linter, on a generated corpus (see ``corpus.py``).
+
+Measures the throughput (lines per second) of the indenter, of the rule
+checking and of full command-line runs on 1, 100 and 10k files, and the peak
+memory of each. The results are written as JSON, and can be compared with
+those of a previous run:
+
+    PYTHONPATH=. python benchmarks/run.py -o after.json [--compare before.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from corpus import generate_module, write_corpus
+
+from fortran_linter.main import Indenter, LineChecker, get_rules
+
+FORMAT_VERSION = 1
+
+
+def _best_of(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        tstart = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - tstart)
+    return best
+
+
+def _peak_memory(func: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _result(nlines: int, seconds: float, peak_memory: int, **extra) -> dict:
+    return {
+        "lines": nlines,
+        "seconds": seconds,
+        "lines_per_second": nlines / seconds,
+        "peak_memory": peak_memory,
+        **extra,
+    }
+
+
+def bench_indent(lines: list[str], repeat: int) -> dict:
+    indenter = Indenter(4)
+
+    def run():
+        indenter.reset()
+        indenter(lines)
+
+    return _result(len(lines), _best_of(run, repeat), _peak_memory(run))
+
+
+def bench_check(fname: str, lines: list[str], repeat: int) -> dict:
+    indented = Indenter(4)(lines)
+    rules = get_rules(120)
+
+    def run():
+        lc = LineChecker(fname, rules=rules, stream=True)
+        lc.check_lines(lines, indented)
+
+    return _result(len(lines), _best_of(run, repeat), _peak_memory(run))
+
+
+def bench_cli(directory: str, nfiles: int, nlines: int, jobs: int) -> dict:
+    """Run the command line on a directory, in a subprocess."""
+    cmd = [
+        sys.executable,
+        "-m",
+        "fortran_linter.cli",
+        directory,
+        "--syntax-only",
+        "--no-cache",
+        "-j",
+        str(jobs),
+    ]
+    tstart = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)  # noqa: S603
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - tstart
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # Maximum resident set size, in KiB on Linux
+    peak = usage.ru_maxrss * 1024
+    return _result(nlines, elapsed, peak, files=nfiles, jobs=jobs)
+
+
+def run_suite(args: argparse.Namespace) -> dict:
+    results = {}
+    source = "".join(generate_module(seed, args.lines) for seed in range(10))
+    lines = source.splitlines(keepends=True)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, "large.f90")
+        with open(fname, "w") as f:
+            f.write(source)
+        print(f"indent ({len(lines)} lines)", file=sys.stderr)
+        results["indent"] = bench_indent(lines, args.repeat)
+        print(f"check ({len(lines)} lines)", file=sys.stderr)
+        results["check"] = bench_check(fname, lines, args.repeat)
+
+        for nfiles in args.files:
+            directory = os.path.join(tmpdir, f"corpus_{nfiles}")
+            paths = write_corpus(directory, nfiles, args.cli_lines)
+            nlines = 0
+            for path in paths:
+                with open(path) as f:
+                    nlines += sum(1 for _ in f)
+            print(f"cli ({nfiles} files, {nlines} lines)", file=sys.stderr)
+            results[f"cli_{nfiles}"] = bench_cli(directory, nfiles, nlines, args.jobs)
+
+    return {
+        "format": FORMAT_VERSION,
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def compare(before: dict, after: dict) -> None:
+    print(f"{'benchmark':<12} {'before':>12} {'after':>12} {'speedup':>8}")
+    for name, result in after["results"].items():
+        old = before["results"].get(name)
+        if old is None:
+            continue
+        speedup = result["lines_per_second"] / old["lines_per_second"]
+        print(
+            f"{name:<12} {old['lines_per_second']:>12.0f} "
+            f"{result['lines_per_second']:>12.0f} {speedup:>7.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="Write the results to this file.")
+    parser.add_argument("--compare", help="Results of a previous run to compare to.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--lines", type=int, default=1000, help="Lines per module (in-process)."
+    )
+    parser.add_argument(
+        "--cli-lines", type=int, default=200, help="Lines per file (CLI runs)."
+    )
+    parser.add_argument(
+        "--files",
+        type=lambda s: [int(n) for n in s.split(",")],
+        default=[1, 100, 10_000],
+        help="Comma-separated numbers of files of the CLI runs.",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    data = run_suite(args)
+    text = json.dumps(data, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), data)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
-;;; flycheck-fortran-linter.el --- Help to have compliant fortran
+;;; flycheck-fortran-linter.el --- Help to have compliant fortran  -*- lexical-binding: t; -*-
 
 ;; Copyright (C) 2017 Corentin Cadiou
 
 ;; Author: Corentin Cadiou <corentin.cadiou@cphyc.me>
 ;; URL: https://github.com/cphyc/fortran-syntax
-;; Version: 1.0.1
+;; Version: 1.1.0
 ;; Keywords: flycheck, fortran, fortran90
-;; Package-Requires: ((flycheck))
+;; Package-Requires: ((emacs "27.1") (flycheck))
 
 ;; This file is not part of GNU Emacs.
 
@@ -26,6 +26,12 @@
 ;;; Commentary:
 
 ;; This is extension for Flycheck.
+;;
+;; Two checkers are provided.  `fortran-linter' runs a new
+;; `fortran-linter' process on every check.  `fortran-linter-server'
+;; keeps a single `fortran-linter-server' process alive and sends it
+;; the content of the buffer, which avoids paying for the startup of
+;; the interpreter and the compilation of the rules on every check.
 
 ;;;; Setup
 
@@ -34,6 +40,10 @@
 ;;      (require 'flycheck-fortran-linter)
 ;;      ;; Add Fortran linter
 ;;      (flycheck-add-next-checker 'fortran/fortran-gfortran `append)))
+;;
+;; To use the server, prefer it to the one-shot checker:
+;;
+;;   (add-to-list 'flycheck-disabled-checkers 'fortran-linter)
 
 ;;; Code:
 
@@ -82,6 +92,123 @@ See URL `https://github.com/cphyc/fortran-syntax'."
 
 (add-to-list 'flycheck-checkers 'fortran-linter 'append)
 
+;;;; Server
+
+(defcustom flycheck-fortran-linter-server-command '("fortran-linter-server")
+  "Command (and arguments) starting the Fortran linter server."
+  :type '(repeat string)
+  :group 'flycheck-options)
+
+(defvar flycheck-fortran-linter--process nil
+  "The running `fortran-linter-server' process, if any.")
+
+(defvar flycheck-fortran-linter--pending ""
+  "Output of the server not yet processed.")
+
+(defvar flycheck-fortran-linter--callbacks (make-hash-table)
+  "Callbacks waiting for a response, indexed by request id.")
+
+(defvar flycheck-fortran-linter--next-id 0
+  "Id of the last request sent to the server.")
+
+(defun flycheck-fortran-linter--sentinel (_process _event)
+  "Fail all the pending checks when the server dies."
+  (unless (process-live-p flycheck-fortran-linter--process)
+    (maphash (lambda (_id callback)
+               (funcall callback '((error (message . "fortran-linter-server died")))))
+             flycheck-fortran-linter--callbacks)
+    (clrhash flycheck-fortran-linter--callbacks)))
+
+(defun flycheck-fortran-linter--filter (_process output)
+  "Dispatch the responses in OUTPUT, one JSON object per line."
+  (setq flycheck-fortran-linter--pending
+        (concat flycheck-fortran-linter--pending output))
+  (while (string-match "\n" flycheck-fortran-linter--pending)
+    (let ((line (substring flycheck-fortran-linter--pending 0 (match-beginning 0))))
+      (setq flycheck-fortran-linter--pending
+            (substring flycheck-fortran-linter--pending (match-end 0)))
+      (let* ((response (json-parse-string line
+                                          :object-type 'alist
+                                          :array-type 'list
+                                          :null-object nil))
+             (id (alist-get 'id response))
+             (callback (gethash id flycheck-fortran-linter--callbacks)))
+        (remhash id flycheck-fortran-linter--callbacks)
+        (when callback
+          (funcall callback response))))))
+
+(defun flycheck-fortran-linter--process ()
+  "Return the server process, starting it if needed."
+  (unless (process-live-p flycheck-fortran-linter--process)
+    (setq flycheck-fortran-linter--pending "")
+    (setq flycheck-fortran-linter--process
+          (make-process :name "fortran-linter-server"
+                        :command flycheck-fortran-linter-server-command
+                        :connection-type 'pipe
+                        :noquery t
+                        :filter #'flycheck-fortran-linter--filter
+                        :sentinel #'flycheck-fortran-linter--sentinel)))
+  flycheck-fortran-linter--process)
+
+(defun flycheck-fortran-linter--document ()
+  "Identify the current buffer for the server, which keeps its state.
+Only the lines affected by the changes since the previous check are
+checked again."
+  (add-hook 'kill-buffer-hook #'flycheck-fortran-linter--close nil t)
+  (format "%s<%s>" (buffer-name) (sxhash-eq (current-buffer))))
+
+(defun flycheck-fortran-linter--close ()
+  "Tell the server to forget about the current buffer."
+  (when (process-live-p flycheck-fortran-linter--process)
+    (process-send-string
+     flycheck-fortran-linter--process
+     (concat (json-serialize
+              `((jsonrpc . "2.0")
+                (method . "close")
+                (params . ((document . ,(flycheck-fortran-linter--document))))))
+             "\n"))))
+
+(defun flycheck-fortran-linter--start (checker callback)
+  "Send the current buffer to the server, reporting to CALLBACK for CHECKER."
+  (let* ((buffer (current-buffer))
+         (id (setq flycheck-fortran-linter--next-id
+                   (1+ flycheck-fortran-linter--next-id)))
+         (params `((filename . ,(or (buffer-file-name) (buffer-name)))
+                   (document . ,(flycheck-fortran-linter--document))
+                   (text . ,(buffer-substring-no-properties (point-min) (point-max)))
+                   (linelength . ,(string-to-number flycheck-fortran-linter-linelength))
+                   (max_errors . ,(string-to-number flycheck-fortran-linter-max-errors))))
+         (request `((jsonrpc . "2.0") (id . ,id) (method . "lint") (params . ,params))))
+    (puthash id
+             (lambda (response)
+               (let ((err (alist-get 'error response)))
+                 (if err
+                     (funcall callback 'errored (alist-get 'message err))
+                   (funcall
+                    callback 'finished
+                    (mapcar
+                     (lambda (diagnostic)
+                       (flycheck-error-new-at
+                        (alist-get 'line diagnostic)
+                        (alist-get 'column diagnostic)
+                        'warning
+                        (alist-get 'message diagnostic)
+                        :checker checker
+                        :buffer buffer))
+                     (alist-get 'diagnostics (alist-get 'result response)))))))
+             flycheck-fortran-linter--callbacks)
+    (process-send-string (flycheck-fortran-linter--process)
+                         (concat (json-serialize request) "\n"))))
+
+(flycheck-define-generic-checker 'fortran-linter-server
+  "A Fortran linter, using a persistent `fortran-linter-server' process.
+
+See URL `https://github.com/cphyc/fortran-syntax'."
+  :start #'flycheck-fortran-linter--start
+  :modes '(f90-mode))
+
+(add-to-list 'flycheck-checkers 'fortran-linter-server 'append)
+
 (provide 'flycheck-fortran-linter)
 
 ;;; flycheck-fortran-linter.el ends here
@@ -1 +1,7 @@
-from .main import FortranRules, LineChecker  # noqa: F401
+import logging
+
+from .api import LintConfig, lint_many, lint_text  # noqa: F401
+from .main import FortranRules, LineChecker, get_rules  # noqa: F401
+
+# Silent unless the application sets up logging (see --log-file)
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -0,0 +1,132 @@
+"""Lint Fortran sources held in memory.
+
+    from fortran_linter import LintConfig, lint_many, lint_text
+
+    result = lint_text("a=1\\n", LintConfig(linelen=80))
+    for diagnostic in result.errors:
+        ...
+
+The rules are compiled once per process and configuration (see
+:func:`.main.get_rules`), and shared by all the calls.
+"""
+
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import NamedTuple
+
+from .main import DEFAULT_SKIP_REGIONS, CheckResult, LineChecker, get_rules
+from .parallel import run_in_order
+
+
+class LintConfig(NamedTuple):
+    """Configuration of a lint run.
+
+    Attributes
+    ----------
+    linelen : int
+        The maximum line length.
+    indent_size : int
+        The indentation size.
+    max_passes : int
+        Apply the corrections up to this number of times, until they reach a
+        fixed point (see :meth:`.main.LineChecker.fix_until_stable`).
+    check_only : bool
+        Only collect the errors, without building the corrected lines.
+    skip_regions : frozenset of str
+        The kinds of regions left unchecked, see :data:`.main.REGIONS`.
+    max_errors : int
+        Stop recording errors once this many have been found in a file (-1
+        for no limit). With ``check_only``, checking stops there.
+    select, ignore : frozenset of str
+        Prefixes of the IDs of the rules to enable (all by default) and to
+        disable, see :class:`.main.FortranRules`.
+    line_timeout, file_timeout : float
+        Give up on the lines and files whose check takes more than this many
+        seconds (-1 for no limit), see :class:`.main.LineChecker`.
+    """
+
+    linelen: int = 120
+    indent_size: int = 4
+    max_passes: int = 1
+    check_only: bool = False
+    skip_regions: frozenset[str] = DEFAULT_SKIP_REGIONS
+    max_errors: int = -1
+    select: frozenset[str] | None = None
+    ignore: frozenset[str] = frozenset()
+    line_timeout: float = -1
+    file_timeout: float = -1
+
+
+DEFAULT_CONFIG = LintConfig()
+
+
+def lint_text(
+    text: str, config: LintConfig = DEFAULT_CONFIG, filename: str = "<text>"
+) -> CheckResult:
+    """Lint the content of a file.
+
+    Parameters
+    ----------
+    text : str
+        The content to check.
+    config : LintConfig, optional
+        The configuration of the linter.
+    filename : str, optional
+        The name reported in the diagnostics. The file is not read.
+
+    Returns
+    -------
+    The errors found and the corrected lines, as :class:`.main.CheckResult`.
+    """
+    lc = LineChecker(
+        filename,
+        indent_size=config.indent_size,
+        rules=get_rules(config.linelen, config.select, config.ignore),
+        max_passes=config.max_passes,
+        check_only=config.check_only,
+        text=text,
+        skip_regions=config.skip_regions,
+        max_errors=config.max_errors,
+        line_timeout=config.line_timeout,
+        file_timeout=config.file_timeout,
+    )
+    return lc.result()
+
+
+def _lint_item(item: tuple[str, str], config: LintConfig) -> CheckResult:
+    filename, text = item
+    return lint_text(text, config, filename)
+
+
+def lint_many(
+    items: Iterable[tuple[str, str]],
+    config: LintConfig = DEFAULT_CONFIG,
+    *,
+    jobs: int = 1,
+    executor: Executor | None = None,
+) -> Iterator[CheckResult]:
+    """Lint several files, yielding the results in the order of ``items``.
+
+    Parameters
+    ----------
+    items : iterable of (str, str)
+        The names and contents of the files. They are consumed lazily.
+    config : LintConfig, optional
+        The configuration of the linter.
+    jobs : int, optional
+        Number of worker processes. With 1, the files are checked in the
+        calling process.
+    executor : concurrent.futures.Executor, optional
+        Pool to run the checks in, e.g. to reuse it across batches; it is not
+        shut down. ``jobs`` should then be its number of workers.
+    """
+    calls = (partial(_lint_item, item, config) for item in items)
+    if executor is not None:
+        yield from run_in_order(executor, calls, 4 * jobs)
+    elif jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            yield from run_in_order(pool, calls, 4 * jobs)
+    else:
+        for call in calls:
+            yield call()
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from .main import DEFAULT_SKIP_REGIONS, CheckResult, Diagnostic, get_rules
+from .source import DEFAULT_ENCODING
+
+DEFAULT_MAX_SIZE = 100 * 1024**2  # bytes
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "fortran-linter")
+
+
+@lru_cache
+def _code_version() -> str:
+    """Identify the linter code, so that upgrades invalidate the cache."""
+    try:
+        pkg_version = version("fortran_linter")
+    except PackageNotFoundError:
+        pkg_version = "unknown"
+    # Also hash the code itself, which catches edits in development installs:
+    # reading, checking and shaping the results are spread over the package
+    h = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        h.update(path.name.encode() + b"\0" + path.read_bytes())
+    return f"{pkg_version}-{h.hexdigest()[:16]}"
+
+
+@lru_cache
+def config_digest(
+    linelen: int,
+    indent_size: int,
+    max_passes: int = 1,
+    check_only: bool = False,
+    skip_regions: frozenset[str] = DEFAULT_SKIP_REGIONS,
+    max_errors: int = -1,
+    select: frozenset[str] | None = None,
+    ignore: frozenset[str] = frozenset(),
+    encoding: str = DEFAULT_ENCODING,
+) -> str:
+    """Digest of everything but the file content that a result depends on."""
+    h = hashlib.sha256()
+    h.update(_code_version().encode())
+    regions = ",".join(sorted(skip_regions))
+    h.update(
+        f"{linelen}:{indent_size}:{max_passes}:{check_only}:{regions}:"
+        f"{max(max_errors, 0)}:{encoding}".encode()
+    )
+    h.update(get_rules(linelen, select, ignore).fingerprint().encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Store :class:`CheckResult` on disk, keyed by file content and configuration.
+
+    Entries are small JSON files. Failures to read or write the cache are never
+    fatal: a broken entry is a cache miss, and an unwritable cache is ignored.
+    """
+
+    directory: str
+    max_size: int
+
+    def __init__(self, directory: str | None = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+
+    def key(
+        self,
+        filename: str,
+        content: bytes | mmap.mmap,
+        linelen: int,
+        indent_size: int,
+        max_passes: int = 1,
+        check_only: bool = False,
+        skip_regions: frozenset[str] = DEFAULT_SKIP_REGIONS,
+        max_errors: int = -1,
+        select: frozenset[str] | None = None,
+        ignore: frozenset[str] = frozenset(),
+        encoding: str = DEFAULT_ENCODING,
+    ) -> str:
+        # The file name is part of the key, as it is embedded in the messages
+        h = hashlib.sha256()
+        digest = config_digest(
+            linelen,
+            indent_size,
+            max_passes,
+            check_only,
+            frozenset(skip_regions),
+            max_errors,
+            select,
+            ignore,
+            encoding,
+        )
+        h.update(digest.encode())
+        h.update(os.fsencode(filename) + b"\0")
+        h.update(content)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str) -> CheckResult | None:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            data["errors"] = [Diagnostic(*error) for error in data["errors"]]
+            data["kept"] = tuple(data["kept"])
+            result = CheckResult(**data)
+            # Mark as recently used for the eviction
+            os.utime(path)
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+        return result
+
+    def put(self, key: str, result: CheckResult) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(result._asdict(), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def prune(self) -> None:
+        """Evict the least recently used entries until the cache fits in
+        ``max_size`` bytes."""
+        entries = []
+        total = 0
+        try:
+            subdirs = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for subdir in subdirs:
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_size:
+            return
+
+        entries.sort()
+        for _mtime, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_size:
+                break
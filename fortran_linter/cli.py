@@ -1,24 +1,77 @@
 import argparse
+import codecs
+import io
 import itertools as it
+import json
+import logging
 import os
-import pathlib
 import sys
-from collections.abc import Sequence
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from functools import partial
 
-from .main import LineChecker
+from .cache import DEFAULT_MAX_SIZE, ResultCache, default_cache_dir
+from .config import ConfigError, ConfigReadError, find_config, load_config
+from .discovery import DEFAULT_EXTENSIONS, iter_files
+from .fileio import atomic_write, write_if_changed, written_line
+from .gitdiff import GitDiffError, LineRanges, changed_lines
+from .main import (
+    DEFAULT_SKIP_REGIONS,
+    REGIONS,
+    CheckResult,
+    LineChecker,
+    RuleCounter,
+    RuleStats,
+    get_rules,
+)
+from .output import FORMATS, Reporter
+from .parallel import run_in_order
+from .source import (
+    DEFAULT_ENCODING,
+    ERRORS,
+    iter_lines,
+    mapped,
+    read_lines,
+    translate_newline,
+)
 
-GLOBS = ["*.f90", "*.f95"]
+logger = logging.getLogger(__name__)
 
+# The result of a file, the time spent in each phase and the rule statistics
+FileResult = tuple[CheckResult, dict[str, float], RuleStats | None]
 
-def _expand_files(file_or_dir: str) -> list[str]:
-    files: list[str] = []
-    if os.path.isdir(file_or_dir):
-        path = pathlib.Path(file_or_dir)
-        for glob in GLOBS:
-            files.extend(str(p) for p in path.glob(glob))
-    else:
-        files.append(file_or_dir)  # always return a collection
-    return files
+
+def _parse_extensions(value: str) -> tuple[str, ...]:
+    return tuple(
+        ext if ext.startswith(".") else f".{ext}"
+        for ext in (ext.strip() for ext in value.split(","))
+        if ext
+    )
+
+
+def _parse_codes(value: str) -> frozenset[str]:
+    return frozenset(code.strip() for code in value.split(",") if code.strip())
+
+
+def _parse_regions(value: str) -> frozenset[str]:
+    regions = frozenset(r.strip() for r in value.split(",") if r.strip())
+    unknown = regions.difference(REGIONS)
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown region(s) {', '.join(sorted(unknown))}, "
+            f"choose from {', '.join(REGIONS)}"
+        )
+    return regions
+
+
+def _parse_encoding(value: str) -> str:
+    try:
+        codecs.lookup(value)
+    except LookupError:
+        raise argparse.ArgumentTypeError(f"unknown encoding {value!r}") from None
+    return value
 
 
 def parse_arguments(input_args: Sequence | None):
@@ -26,16 +79,53 @@ def parse_arguments(input_args: Sequence | None):
     parser.add_argument(
         "input",
         nargs="+",
-        type=_expand_files,
         help=(
             "Input file(s) or directories.\n"
-            "If the input is a directory all files with extension "
-            "f90 and f95 are checked."
+            "If the input is a directory all files with one of the "
+            "extensions (see --extensions) are checked."
+        ),
+    )
+    parser.add_argument(
+        "-r",
+        "--recursive",
+        action="store_true",
+        help="Search the input directories recursively.",
+    )
+    parser.add_argument(
+        "--extensions",
+        type=_parse_extensions,
+        default=DEFAULT_EXTENSIONS,
+        help=(
+            "Comma-separated, case-sensitive extensions of the files to check "
+            "in directories, e.g. .f90,.F90,.f03,.f08,.F. "
+            "Default %(default)s."
+        ),
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help=(
+            "Skip the files and directories matching this glob pattern "
+            "(can be repeated)."
         ),
     )
+    parser.add_argument(
+        "--no-gitignore",
+        dest="gitignore",
+        action="store_false",
+        help="Do not skip the files ignored by .gitignore files.",
+    )
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
-        "-i", "--inplace", action="store_true", help="Correct the errors inplace."
+        "-i",
+        "--inplace",
+        action="store_true",
+        help=(
+            "Correct the errors inplace. Files are only written if their content "
+            "changes."
+        ),
     )
     group.add_argument("--stdout", action="store_true", help="Output to stdout")
     group.add_argument(
@@ -44,6 +134,46 @@ def parse_arguments(input_args: Sequence | None):
         action="store_true",
         help="Print syntax errors to stdout. Default %(default)s.",
     )
+    parser.add_argument(
+        "--fix-until-stable",
+        action="store_true",
+        help=(
+            "Apply the corrections repeatedly, in memory, until the output "
+            "does not change anymore (see --max-passes)."
+        ),
+    )
+    parser.add_argument(
+        "--max-passes",
+        type=int,
+        default=10,
+        help=(
+            "Maximum number of passes with --fix-until-stable. A warning is "
+            "printed for the files that have not converged. Default %(default)s."
+        ),
+    )
+    parser.add_argument(
+        "--backup",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="With --inplace, keep the original files as FILE.orig. Default on.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="text",
+        help=(
+            "Format of the errors printed with --syntax-only: gfortran-like "
+            "text, one line per error (gcc), JSON or SARIF. Default %(default)s."
+        ),
+    )
+    parser.add_argument(
+        "--diff-base",
+        metavar="REV",
+        help=(
+            "Only check the files changed relative to this git revision, and "
+            "only report the errors on the changed lines. Disables the cache."
+        ),
+    )
     parser.add_argument(
         "--linelength", type=int, default=120, help="Line length. Default %(default)s."
     )
@@ -53,56 +183,565 @@ def parse_arguments(input_args: Sequence | None):
         default=4,
         help="Indentation size. Default %(default)s.",
     )
+    parser.add_argument(
+        "--encoding",
+        type=_parse_encoding,
+        default=DEFAULT_ENCODING,
+        help=(
+            "Encoding of the non-ASCII files. Bytes that do not decode are kept "
+            "as they are. Default %(default)s."
+        ),
+    )
+    parser.add_argument(
+        "--select",
+        type=_parse_codes,
+        metavar="CODES",
+        help=(
+            "Comma-separated IDs (or prefixes of IDs, e.g. S for all the spacing "
+            "rules) of the rules to enable. Default: all."
+        ),
+    )
+    parser.add_argument(
+        "--ignore",
+        type=_parse_codes,
+        metavar="CODES",
+        help="Comma-separated IDs (or prefixes of IDs) of the rules to disable.",
+    )
+    parser.add_argument(
+        "--config",
+        help=(
+            "pyproject.toml file to read the [tool.fortran-linter] table from. "
+            "Default: the closest one in the current directory or its parents. "
+            "--select and --ignore override it."
+        ),
+    )
+    parser.add_argument(
+        "--skip-regions",
+        type=_parse_regions,
+        default=DEFAULT_SKIP_REGIONS,
+        metavar="REGIONS",
+        help=(
+            "Comma-separated kinds of regions to leave unchecked: markers (from "
+            "'! fortran-linter: off' to '! fortran-linter: on'), preprocessor "
+            "(#if... blocks), data (continued data statements and array "
+            "constructors). Use '' to check everything. Default: markers."
+        ),
+    )
     parser.add_argument(
         "--max-errors",
         default=-1,
         type=int,
         help=(
-            "Maximum number of errors to report. Set "
-            "to -1 to deactivate. Default %(default)s"
+            "Maximum number of errors to report per file. Checking stops there "
+            "with --syntax-only. Set to -1 to deactivate. Default %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--max-total-errors",
+        default=-1,
+        type=int,
+        help=(
+            "Stop the run, skipping the remaining files, once this number of "
+            "errors has been found. Set to -1 to deactivate. Default %(default)s"
+        ),
+    )
+    parser.add_argument(
+        "--line-timeout",
+        default=-1,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Give up on the lines whose check takes longer, leaving them "
+            "unchanged and reporting them. The results then depend on the load "
+            "of the machine. Default: no limit (-1)"
+        ),
+    )
+    parser.add_argument(
+        "--file-timeout",
+        default=-1,
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Give up on the files whose check takes longer, leaving them "
+            "unchanged and reporting them. The results then depend on the load "
+            "of the machine. Default: no limit (-1)"
+        ),
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of files to check in parallel. Default %(default)s.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=default_cache_dir(),
+        help="Directory where results are cached. Default %(default)s.",
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        type=int,
+        default=DEFAULT_MAX_SIZE // 1024**2,
+        help="Maximum size of the cache, in MiB. Default %(default)s.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Do not read nor write cached results.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Process files one line at a time, writing corrections and errors "
+            "as they are found. Memory usage does not depend on the file size. "
+            "Files are checked serially, without cache."
+        ),
+    )
+    parser.add_argument(
+        "--log-file",
+        help="Write debug logs to this file. Default: no logs.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report the time spent in each phase to stderr.",
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="table",
+        choices=("table", "json"),
+        help=(
+            "Report per-rule statistics (time, lines scanned, matches, "
+            "corrections) to stderr, as a table or as JSON. Disables the cache."
         ),
     )
     parser.add_argument("-v", "--verbose", action="store_true", help="Be verbose.")
 
     args = parser.parse_args(input_args)
+    if args.fix_until_stable and args.stream:
+        parser.error("--fix-until-stable needs whole files, it cannot be streamed")
+    # Only the errors of the first pass are reported
+    fix = args.fix_until_stable and not args.syntax_only
+    args.max_passes = args.max_passes if fix else 1
+
+    config_file = args.config or find_config(os.getcwd())
+    try:
+        config = load_config(config_file) if config_file else {}
+    except ConfigReadError as e:
+        # Only an explicit --config has to be readable
+        if args.config is not None:
+            parser.error(str(e))
+        print(f"Warning: {e}, ignoring it", file=sys.stderr)
+        config = {}
+    except ConfigError as e:
+        parser.error(str(e))
+    if args.select is None:
+        args.select = config.get("select")
+    if args.ignore is None:
+        args.ignore = config.get("ignore", frozenset())
+    try:
+        # Compile the rules once, also checking the IDs
+        get_rules(args.linelength, args.select, args.ignore)
+    except ValueError as e:
+        parser.error(str(e))
 
     return args
 
 
+def _budget(args: argparse.Namespace, nerrors: int) -> int:
+    """Return the maximum number of errors of the next file (-1 for no limit),
+    after ``nerrors`` errors have been found in the previous files."""
+    limits = []
+    if args.max_errors > 0:
+        limits.append(args.max_errors)
+    if args.max_total_errors > 0:
+        # `main` stops before the next file once this is used up
+        limits.append(args.max_total_errors - nerrors)
+    return min(limits, default=-1)
+
+
+def _budget_used(args: argparse.Namespace, nerrors: int) -> bool:
+    return 0 < args.max_total_errors <= nerrors
+
+
+def _setup_logging(log_file: str | None) -> None:
+    if log_file is None:
+        return
+    package_logger = logging.getLogger("fortran_linter")
+    # Workers forked from the main process already inherit the handler
+    path = os.path.abspath(log_file)
+    if any(getattr(h, "baseFilename", None) == path for h in package_logger.handlers):
+        return
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s %(process)d %(name)s %(levelname)s: %(message)s")
+    )
+    package_logger.addHandler(handler)
+    package_logger.setLevel(logging.DEBUG)
+
+
+def _check_file(
+    ifile: str,
+    args: argparse.Namespace,
+    line_filter: LineRanges | None = None,
+    max_errors: int = -1,
+) -> FileResult:
+    res, timings, stats = _lint_file(ifile, args, line_filter, max_errors)
+    if args.inplace:
+        # Nothing to write when all the lines are kept, e.g. when the check of
+        # the file has timed out
+        if len(res.kept) < len(res.corrected_lines):
+            # Write back from the worker, in parallel with the checks of other
+            # files
+            tstart = time.perf_counter()
+            content = _corrected_content(ifile, res, args.encoding)
+            if write_if_changed(
+                ifile, content, backup=args.backup, encoding=args.encoding
+            ):
+                logger.debug("Wrote %s", ifile)
+            timings["write"] = time.perf_counter() - tstart
+        # No need to send the corrected lines back
+        res = res._replace(corrected_lines=[], kept=())
+    return res, timings, stats
+
+
+def _corrected_content(ifile: str, res: CheckResult, encoding: str) -> str:
+    """Return the content to write back: the corrected lines, and the lines
+    kept unchanged as they are in the file, newlines and whitespace included."""
+    kept = set(res.kept)
+    raw_lines = read_lines(ifile, encoding, newline="") if kept else []
+    if len(raw_lines) != len(res.corrected_lines):
+        # The lines have been moved by the corrections (with --fix-until-stable)
+        kept = set()
+    return "".join(
+        raw_lines[lineno - 1] if lineno in kept else written_line(line)
+        for lineno, line in enumerate(res.corrected_lines, start=1)
+    )
+
+
+def _lint_file(
+    ifile: str,
+    args: argparse.Namespace,
+    line_filter: LineRanges | None = None,
+    max_errors: int = -1,
+) -> FileResult:
+    stats = RuleStats() if args.stats else None
+    cache = args.result_cache
+    if cache is not None:
+        tstart = time.perf_counter()
+        with mapped(ifile) as data:
+            key = cache.key(
+                ifile,
+                data,
+                args.linelength,
+                args.indent_size,
+                args.max_passes,
+                args.syntax_only,
+                args.skip_regions,
+                max_errors,
+                args.select,
+                args.ignore,
+                args.encoding,
+            )
+        res = cache.get(key)
+        timings = {"cache": time.perf_counter() - tstart}
+        if res is not None:
+            logger.debug("Cache hit for %s", ifile)
+            return res, timings, stats
+
+    lc = LineChecker(
+        ifile,
+        print_progress=False,
+        rules=get_rules(args.linelength, args.select, args.ignore),
+        indent_size=args.indent_size,
+        stats=stats,
+        line_filter=line_filter,
+        max_passes=args.max_passes,
+        check_only=args.syntax_only,
+        skip_regions=args.skip_regions,
+        max_errors=max_errors,
+        encoding=args.encoding,
+        line_timeout=args.line_timeout,
+        file_timeout=args.file_timeout,
+    )
+    res = lc.result()
+    if cache is not None:
+        tstart = time.perf_counter()
+        # Timeouts depend on the load of the machine
+        if not lc.timed_out:
+            cache.put(key, res)
+        timings["cache"] += time.perf_counter() - tstart
+        timings.update(lc.timings)
+    else:
+        timings = lc.timings
+    return res, timings, stats
+
+
+def _iter_results(
+    files: Iterable[str],
+    args: argparse.Namespace,
+    line_filters: dict[str, LineRanges] | None = None,
+) -> Iterator[FileResult]:
+    """Check all files, yielding the results in the order of ``files``.
+
+    The files are submitted to the workers as they are produced, so that
+    checking starts before ``files`` is exhausted. Each file gets the error
+    budget left by the results yielded before its submission (see
+    :func:`_budget`), and none is submitted once it is used up.
+    """
+    files = iter(files)
+    # The workers are all started up front: no more than there are files
+    head = list(it.islice(files, max(args.jobs, 1)))
+    files = it.chain(head, files)
+    njobs = min(args.jobs, len(head))
+    # Errors in the results yielded so far
+    nerrors = 0
+
+    def calls() -> Iterator[Callable[[], FileResult]]:
+        # Consumed as the results are yielded, with the budget left by them
+        for ifile in files:
+            if _budget_used(args, nerrors):
+                return
+            line_filter = _line_filter(ifile, line_filters)
+            yield partial(_check_file, ifile, args, line_filter, _budget(args, nerrors))
+
+    if njobs <= 1:
+        for call in calls():
+            result = call()
+            nerrors += len(result[0].errors)
+            yield result
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=njobs, initializer=_setup_logging, initargs=(args.log_file,)
+    ) as executor:
+        # When the caller stops early, e.g. with --max-total-errors, do not wait
+        # for the files that are not being checked yet
+        with closing(run_in_order(executor, calls(), 4 * njobs)) as results:
+            for result in results:
+                nerrors += len(result[0].errors)
+                yield result
+
+
+def _line_filter(
+    ifile: str, line_filters: dict[str, LineRanges] | None
+) -> LineRanges | None:
+    if line_filters is None:
+        return None
+    return line_filters[os.path.realpath(ifile)]
+
+
+def _stream_file(
+    ifile: str,
+    args: argparse.Namespace,
+    stats: RuleStats | None,
+    line_filter: LineRanges | None = None,
+    reporter: Reporter | None = None,
+    max_errors: int = -1,
+) -> LineChecker:
+    """Check a file line by line, writing the output incrementally."""
+    lc = LineChecker(
+        ifile,
+        print_progress=False,
+        rules=get_rules(args.linelength, args.select, args.ignore),
+        indent_size=args.indent_size,
+        stats=stats,
+        stream=True,
+        line_filter=line_filter,
+        check_only=reporter is not None,
+        skip_regions=args.skip_regions,
+        max_errors=max_errors,
+        encoding=args.encoding,
+        line_timeout=args.line_timeout,
+        file_timeout=args.file_timeout,
+    )
+    # Read untranslated, to write the lines kept unchanged back as they are
+    with closing(iter_lines(ifile, args.encoding, newline="")) as raw_lines:
+        fin = map(translate_newline, raw_lines)
+        if reporter is not None:
+            for _line, errors in lc.iter_check(fin):
+                if errors:
+                    reporter.report(errors)
+            if lc.errcount == 0:
+                reporter.report([])
+        elif args.stdout:
+            for line, _errors in lc.iter_check(fin):
+                sys.stdout.write(line)
+            sys.stdout.write("\n")
+        elif args.inplace:
+            to_write, to_check = it.tee(raw_lines)
+            checked = lc.iter_check(map(translate_newline, to_check))
+            corrected = (
+                raw_line if lineno in lc.kept else written_line(line)
+                for lineno, (raw_line, (line, _errors)) in enumerate(
+                    zip(to_write, checked, strict=True), start=1
+                )
+            )
+            if atomic_write(
+                ifile, corrected, backup=args.backup, encoding=args.encoding
+            ):
+                logger.debug("Wrote %s", ifile)
+        else:
+            for _ in lc.iter_check(fin):
+                pass
+    return lc
+
+
+def _print_profile(timings: dict[str, float], nfiles: int, wall: float) -> None:
+    total = sum(timings.values())
+    print(f"Profile of {nfiles} file(s)", file=sys.stderr)
+    print(f"{'phase':<10} {'time (s)':>10} {'share':>7}", file=sys.stderr)
+    for phase, elapsed in timings.items():
+        share = elapsed / total if total > 0 else 0
+        print(f"{phase:<10} {elapsed:>10.4f} {share:>7.1%}", file=sys.stderr)
+    # In parallel runs, the phases are summed over all workers
+    print(f"{'total':<10} {total:>10.4f}", file=sys.stderr)
+    print(f"{'wall':<10} {wall:>10.4f}", file=sys.stderr)
+
+
+def _print_stats(stats: RuleStats, fmt: str) -> None:
+    data = stats.as_dict()
+    if fmt == "json":
+        json.dump(data, sys.stderr, indent=2)
+        print(file=sys.stderr)
+        return
+
+    width = max((len(name) for name in data), default=4)
+    header = f"{'rule':<{width}} {'time (ms)':>10}" + "".join(
+        f" {field:>8}" for field in RuleCounter.FIELDS[1:]
+    )
+    print(header, file=sys.stderr)
+    for name, counter in data.items():
+        row = f"{name:<{width}} {counter['time'] * 1e3:>10.2f}" + "".join(
+            f" {counter[field]:>8}" for field in RuleCounter.FIELDS[1:]
+        )
+        print(row, file=sys.stderr)
+
+
+def _unique(files: Iterable[str]) -> Iterator[str]:
+    """Drop duplicated files, keeping the input order."""
+    seen = set()
+    for ifile in files:
+        if ifile not in seen:
+            seen.add(ifile)
+            yield ifile
+
+
 def main(input_args=None):
     args = parse_arguments(input_args)
+    if isinstance(sys.stdout, io.TextIOWrapper):
+        # Print the undecodable bytes of the files (see --encoding) as they are
+        sys.stdout.reconfigure(errors=ERRORS)
+    _setup_logging(args.log_file)
+    tstart_run = time.perf_counter()
     nerrors = 0
+    if args.cache and not (args.stats or args.stream or args.diff_base):
+        args.result_cache = ResultCache(args.cache_dir, args.cache_max_size * 1024**2)
+    else:
+        args.result_cache = None
 
-    files = it.chain(*args.input)  # here we flatten all the lists
-    for ifile in set(files):
-        if args.verbose:
-            print(f"Checking {ifile}")
-        lc = LineChecker(
-            ifile,
-            print_progress=False,
-            linelen=args.linelength,
-            indent_size=args.indent_size,
+    files = _unique(
+        iter_files(
+            args.input,
+            recursive=args.recursive,
+            extensions=args.extensions,
+            exclude=args.exclude,
+            gitignore=args.gitignore,
         )
+    )
+    line_filters = None
+    if args.diff_base is not None:
+        try:
+            line_filters = changed_lines(args.diff_base)
+        except GitDiffError as e:
+            print(f"Could not diff against {args.diff_base}: {e}", file=sys.stderr)
+            sys.exit(2)
+        # Skip the unchanged files without reading them
+        files = (f for f in files if os.path.realpath(f) in line_filters)
+    nfiles = 0
+    reporter = Reporter(args.format, sys.stdout) if args.syntax_only else None
 
-        nerrors += lc.errcount
-        if args.syntax_only:
-            if args.max_errors > 0:
-                errs = lc.errors[: args.max_errors]
+    profile = dict.fromkeys(("read", "indent", "check", "cache", "write"), 0.0)
+    all_stats = RuleStats()
+    if args.stream:
+        for ifile in files:
+            nfiles += 1
+            if args.verbose:
+                print(f"Checking {ifile}")
+            stats = RuleStats() if args.stats else None
+            lc = _stream_file(
+                ifile,
+                args,
+                stats,
+                _line_filter(ifile, line_filters),
+                reporter,
+                _budget(args, nerrors),
+            )
+            for phase, elapsed in lc.timings.items():
+                profile[phase] += elapsed
+            if stats is not None:
+                all_stats.merge(stats)
+            nerrors += lc.errcount
+            if (args.stdout or args.inplace) and args.verbose:
+                print(f"{lc.modifcount} modifications.")
+            if _budget_used(args, nerrors):
+                break
+    else:
+        for res, timings, stats in _iter_results(files, args, line_filters):
+            nfiles += 1
+            for phase, elapsed in timings.items():
+                profile[phase] += elapsed
+            if stats is not None:
+                all_stats.merge(stats)
+            ifile = res.filename
+            if args.verbose:
+                print(f"Checking {ifile}")
+
+            # Files checked in parallel may go over the run's budget
+            errs = res.errors
+            budget = _budget(args, nerrors)
+            if budget > 0:
+                errs = errs[:budget]
+            nerrors += len(errs)
+            if not res.converged:
+                print(
+                    f"{ifile}: corrections did not converge after "
+                    f"{args.max_passes} passes",
+                    file=sys.stderr,
+                )
+            tstart = time.perf_counter()
+            if reporter is not None:
+                reporter.report(errs)
             else:
-                errs = lc.errors
-            print("\n".join(errs))
-            continue
+                if (args.stdout or args.inplace) and args.verbose:
+                    print(f"{res.modifcount} modifications.")
+                if args.stdout:
+                    print("".join(res.corrected_lines))
+            profile["write"] += time.perf_counter() - tstart
+            if _budget_used(args, nerrors):
+                break
 
-        if (args.stdout or args.inplace) and args.verbose:
-            print(f"{lc.modifcount} modifications.")
+    if _budget_used(args, nerrors):
+        print(f"Stopped after {nerrors} errors (--max-total-errors)", file=sys.stderr)
 
-        if args.stdout:
-            print("".join(lc.corrected_lines))
-        elif args.inplace:
-            # Copy original file
-            os.rename(ifile, ifile + ".orig")
-            with open(ifile, "w") as f:
-                f.writelines(_.rstrip() + "\n" for _ in lc.corrected_lines)
+    if reporter is not None:
+        tstart = time.perf_counter()
+        reporter.close()
+        profile["write"] += time.perf_counter() - tstart
+
+    if args.result_cache is not None:
+        tstart = time.perf_counter()
+        args.result_cache.prune()
+        profile["cache"] += time.perf_counter() - tstart
+
+    if args.profile:
+        _print_profile(profile, nfiles, time.perf_counter() - tstart_run)
+    if args.stats:
+        _print_stats(all_stats, args.stats)
 
     if nerrors > 0:
         sys.exit(1)
@@ -0,0 +1,74 @@
+"""Configuration read from the ``[tool.fortran-linter]`` table of
+``pyproject.toml`` files.
+
+    [tool.fortran-linter]
+    select = ["S", "W"]
+    ignore = ["M005"]
+"""
+
+import os
+import sys
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+CONFIG_FILE = "pyproject.toml"
+KEYS = ("select", "ignore")
+
+
+class ConfigError(ValueError):
+    pass
+
+
+class ConfigReadError(ConfigError):
+    """The file cannot be read or parsed, so it may not configure the linter at
+    all (e.g. the ``pyproject.toml`` of an enclosing project)."""
+
+
+def find_config(start: str) -> str | None:
+    """Return the closest ``pyproject.toml`` in ``start`` or its parents."""
+    directory = os.path.abspath(start)
+    while True:
+        path = os.path.join(directory, CONFIG_FILE)
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def load_config(path: str) -> dict[str, frozenset[str]]:
+    """Read the linter configuration of a ``pyproject.toml`` file.
+
+    Returns
+    -------
+    The rule prefixes of the ``select`` and ``ignore`` keys that are set.
+
+    Raises
+    ------
+    ConfigReadError
+        If the file cannot be read or parsed.
+    ConfigError
+        If the configuration is invalid.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        raise ConfigReadError(f"Could not read {path}: {e}") from None
+
+    tool = data.get("tool", {})
+    table = tool.get("fortran-linter", {}) if isinstance(tool, dict) else {}
+    if not isinstance(table, dict):
+        raise ConfigError(f"{path}: [tool.fortran-linter] should be a table")
+    config = {}
+    for key, value in table.items():
+        if key not in KEYS:
+            raise ConfigError(f"{path}: unknown key {key!r} in [tool.fortran-linter]")
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise ConfigError(f"{path}: {key} should be a list of rule IDs")
+        config[key] = frozenset(value)
+    return config
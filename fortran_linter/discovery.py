@@ -0,0 +1,209 @@
+"""Lazy discovery of the Fortran files to check."""
+
+import fnmatch
+import os
+import re
+from collections.abc import Iterable, Iterator, Sequence
+
+DEFAULT_EXTENSIONS = (".f90", ".f95")
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regular expression."""
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            # Zero or more directories
+            res.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == n:
+            # Everything inside
+            res.append("/.*")
+            i += 3
+            continue
+        if c == "*":
+            res.append("[^/]*")
+        elif c == "?":
+            res.append("[^/]")
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            res.append(re.escape(pattern[i]))
+        elif c == "[":
+            j = pattern.find("]", i + 2)
+            if j == -1:
+                res.append(re.escape(c))
+            else:
+                content = pattern[i + 1 : j]
+                if content.startswith("!"):
+                    content = "^" + content[1:]
+                res.append(f"[{content}]")
+                i = j
+        else:
+            res.append(re.escape(c))
+        i += 1
+    return "".join(res)
+
+
+class GitIgnore:
+    """The patterns of a ``.gitignore`` file.
+
+    This supports the common subset of the syntax: globs (``*``, ``?``,
+    ``[...]``, ``**``), negation (``!``), directory-only patterns (trailing
+    ``/``) and patterns anchored to the directory of the file.
+    """
+
+    base: str
+    patterns: list[tuple[re.Pattern, bool, bool]]
+
+    def __init__(self, base: str, lines: Iterable[str]):
+        self.base = base
+        self.patterns = []
+        for raw in lines:
+            line = raw.rstrip("\n")
+            # Trailing spaces are ignored unless escaped
+            if not line.endswith("\\ "):
+                line = line.rstrip(" ")
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            if "/" in line:
+                # Relative to the directory of the .gitignore file
+                regexp = _translate(line.lstrip("/"))
+            else:
+                regexp = "(?:.*/)?" + _translate(line)
+            self.patterns.append((re.compile(regexp + r"\Z", re.S), negate, dir_only))
+
+    @classmethod
+    def from_directory(cls, base: str) -> "GitIgnore | None":
+        try:
+            with open(os.path.join(base, ".gitignore")) as f:
+                return cls(base, f.readlines())
+        except OSError:
+            return None
+
+    def match(self, path: str, is_dir: bool) -> bool | None:
+        """Whether ``path`` is ignored, or None if no pattern applies."""
+        relpath = os.path.relpath(path, self.base).replace(os.sep, "/")
+        decision = None
+        for regexp, negate, dir_only in self.patterns:
+            if dir_only and not is_dir:
+                continue
+            if regexp.match(relpath):
+                decision = not negate
+        return decision
+
+
+def _find_repository_root(path: str) -> str | None:
+    path = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(path, ".git")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def _parent_ignores(top: str) -> list[GitIgnore]:
+    """Load the .gitignore files of the parents of ``top`` in its repository."""
+    top = os.path.abspath(top)
+    root = _find_repository_root(top)
+    if root is None:
+        return []
+    parents = []
+    path = os.path.dirname(top)
+    while len(path) >= len(root):
+        parents.append(path)
+        if path == root:
+            break
+        path = os.path.dirname(path)
+    ignores = [GitIgnore.from_directory(p) for p in reversed(parents)]
+    return [ignore for ignore in ignores if ignore is not None]
+
+
+def _is_ignored(path: str, is_dir: bool, ignores: list[GitIgnore]) -> bool:
+    # Deeper .gitignore files take precedence
+    for ignore in reversed(ignores):
+        decision = ignore.match(path, is_dir)
+        if decision is not None:
+            return decision
+    return False
+
+
+def iter_files(
+    inputs: Iterable[str],
+    *,
+    recursive: bool = False,
+    extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+    exclude: Sequence[str] = (),
+    gitignore: bool = True,
+) -> Iterator[str]:
+    """Yield the files to check, as they are found.
+
+    Parameters
+    ----------
+    inputs : iterable of str
+        Files or directories. Files are yielded as is, directories are
+        searched for files with one of the ``extensions``.
+    recursive : bool
+        Search the subdirectories as well.
+    extensions : sequence of str
+        The (case-sensitive) extensions of the files to check in directories.
+    exclude : sequence of str
+        Glob patterns of files and directories to skip, matched against
+        their name and their path relative to the input directory.
+    gitignore : bool
+        Skip the files and directories ignored by ``.gitignore`` files.
+    """
+    extensions = tuple(extensions)
+    for path in inputs:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        ignores = _parent_ignores(path) if gitignore else []
+        # Depth-first walk, with the ignore files of each directory level
+        stack: list[tuple[str, list[GitIgnore]]] = [(path, ignores)]
+        while stack:
+            directory, ignores = stack.pop()
+            if gitignore:
+                ignore = GitIgnore.from_directory(directory)
+                if ignore is not None:
+                    ignores = [*ignores, ignore]
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                is_dir = entry.is_dir()
+                if is_dir and (not recursive or entry.name == ".git"):
+                    continue
+                if not is_dir and not entry.name.endswith(extensions):
+                    continue
+                relpath = os.path.relpath(entry.path, path).replace(os.sep, "/")
+                if any(
+                    fnmatch.fnmatchcase(entry.name, pattern)
+                    or fnmatch.fnmatchcase(relpath, pattern)
+                    for pattern in exclude
+                ):
+                    continue
+                if ignores and _is_ignored(entry.path, is_dir, ignores):
+                    continue
+                if is_dir:
+                    subdirs.append((entry.path, ignores))
+                else:
+                    yield entry.path
+            # Visit the subdirectories in order
+            stack.extend(reversed(subdirs))
@@ -0,0 +1,95 @@
+"""Atomic writing of corrected files."""
+
+import filecmp
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable
+
+from .source import DEFAULT_ENCODING, ERRORS
+
+BACKUP_SUFFIX = ".orig"
+
+
+def _backup(path: str) -> None:
+    backup_path = path + BACKUP_SUFFIX
+    if os.path.lexists(backup_path):
+        os.unlink(backup_path)
+    try:
+        # The original file is kept as is, mtime included
+        os.link(path, backup_path)
+    except OSError:
+        shutil.copy2(path, backup_path)
+
+
+def written_line(line: str) -> str:
+    """Return a corrected line as written back: without trailing whitespace,
+    and ending with the newline of the platform."""
+    return line.rstrip().replace("\n", os.linesep) + os.linesep
+
+
+def atomic_write(
+    path: str,
+    chunks: Iterable[str],
+    *,
+    backup: bool = True,
+    encoding: str = DEFAULT_ENCODING,
+) -> bool:
+    """Replace the content of a file, if it changes.
+
+    The new content is written to a temporary file next to ``path``, which
+    then replaces it atomically: ``path`` is never left partially written.
+
+    Parameters
+    ----------
+    path : str
+        The file to write.
+    chunks : iterable of str
+        The new content, e.g. the corrected lines. It is consumed lazily, and
+        written as is: newlines are not translated (see :func:`written_line`).
+    backup : bool
+        Keep the original file as ``path + ".orig"``.
+    encoding : str
+        The encoding of the file. The undecodable bytes it was read with are
+        written back as they were (see :mod:`.source`).
+
+    Returns
+    -------
+    Whether the file has been written. It is left untouched (mtime included)
+    if its content is unchanged.
+    """
+    dirname, basename = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, prefix=f".{basename}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, errors=ERRORS, newline="") as f:
+            f.writelines(chunks)
+        if filecmp.cmp(tmp_path, path, shallow=False):
+            os.unlink(tmp_path)
+            return False
+        shutil.copymode(path, tmp_path)
+        if backup:
+            _backup(path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+
+def write_if_changed(
+    path: str, content: str, *, backup: bool = True, encoding: str = DEFAULT_ENCODING
+) -> bool:
+    """Write ``content`` to a file atomically, unless it already holds it.
+
+    Unlike :func:`atomic_write`, nothing is written at all when the content
+    is unchanged. See :func:`atomic_write` for the parameters.
+    """
+    try:
+        with open(path, newline="", encoding=encoding, errors=ERRORS) as f:
+            unchanged = f.read() == content
+    except (OSError, UnicodeDecodeError):
+        unchanged = False
+    if unchanged:
+        return False
+    return atomic_write(path, [content], backup=backup, encoding=encoding)
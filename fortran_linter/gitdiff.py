@@ -0,0 +1,154 @@
+"""Find the lines changed relative to a git revision."""
+
+import codecs
+import os
+import re
+import subprocess
+from bisect import bisect_right
+from collections.abc import Iterable
+
+HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+class GitDiffError(RuntimeError):
+    pass
+
+
+class LineRanges:
+    """A set of 1-based line numbers, stored as sorted ``[start, stop)`` ranges."""
+
+    __slots__ = ("starts", "stops")
+
+    starts: list[int]
+    stops: list[int]
+
+    def __init__(self, ranges: Iterable[tuple[int, int]] = ()):
+        self.starts = []
+        self.stops = []
+        for start, stop in sorted(ranges):
+            if start >= stop:
+                continue
+            if self.stops and start <= self.stops[-1]:
+                self.stops[-1] = max(self.stops[-1], stop)
+            else:
+                self.starts.append(start)
+                self.stops.append(stop)
+
+    def __contains__(self, lineno: object) -> bool:
+        if not isinstance(lineno, int):
+            return False
+        i = bisect_right(self.starts, lineno) - 1
+        return i >= 0 and lineno < self.stops[i]
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    def __repr__(self) -> str:
+        ranges = ", ".join(
+            f"{a}-{b - 1}" for a, b in zip(self.starts, self.stops, strict=True)
+        )
+        return f"LineRanges({ranges})"
+
+
+def _git(*args: str, cwd: str | None = None) -> str:
+    try:
+        proc = subprocess.run(  # noqa: S603
+            ["git", "-c", "core.quotePath=false", *args],  # noqa: S607
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except OSError as e:
+        raise GitDiffError(f"Could not run git: {e}") from e
+    if proc.returncode != 0:
+        raise GitDiffError(proc.stderr.strip() or f"git {args[0]} failed")
+    return proc.stdout
+
+
+def _unquote(path: str) -> str:
+    # Paths with special characters are quoted, with C-style escapes
+    if path.startswith('"') and path.endswith('"'):
+        raw = codecs.escape_decode(path[1:-1].encode())[0]
+        return raw.decode("utf-8", "surrogateescape")  # type: ignore[union-attr]
+    return path
+
+
+def parse_diff(diff: str) -> dict[str, LineRanges]:
+    """Parse a ``git diff --unified=0 --no-prefix`` output.
+
+    Returns
+    -------
+    The added or modified lines of each file of the new revision, keyed by
+    its path relative to the root of the repository. Files without any such
+    line (e.g. with only deletions) are left out.
+    """
+    changes: dict[str, list[tuple[int, int]]] = {}
+    current: list[tuple[int, int]] | None = None
+    # Added lines may look like headers, e.g. "+++ x" when adding "++ x"
+    in_header = False
+    for line in diff.splitlines():
+        if line.startswith("diff "):
+            in_header = True
+            current = None
+        elif in_header and line.startswith("+++ "):
+            path = line[4:].rstrip("\t")
+            if path != "/dev/null":
+                current = changes[_unquote(path)] = []
+        elif line.startswith("@@"):
+            in_header = False
+            match = HUNK_RE.match(line)
+            if current is None or match is None:
+                continue
+            start = int(match.group(1))
+            count = 1 if match.group(2) is None else int(match.group(2))
+            if count > 0:
+                current.append((start, start + count))
+    return {
+        path: ranges
+        for path, ranges in ((p, LineRanges(r)) for p, r in changes.items())
+        if ranges
+    }
+
+
+def changed_lines(base: str, cwd: str | None = None) -> dict[str, LineRanges]:
+    """Return the lines changed in the working tree relative to ``base``.
+
+    This only uses the local repository.
+
+    Parameters
+    ----------
+    base : str
+        Any revision understood by git, e.g. ``origin/main`` or ``HEAD~3``.
+    cwd : str, optional
+        A directory inside the repository. Defaults to the current directory.
+
+    Returns
+    -------
+    The added or modified lines of each file, keyed by its real path.
+
+    Raises
+    ------
+    GitDiffError
+        If git is not available, ``cwd`` is not in a repository or ``base``
+        is not a valid revision.
+    """
+    if base.startswith("-"):
+        raise GitDiffError(f"Invalid revision {base!r}")
+    root = _git("rev-parse", "--show-toplevel", cwd=cwd).strip()
+    diff = _git(
+        "diff",
+        "--unified=0",
+        "--no-prefix",
+        "--no-color",
+        "--no-ext-diff",
+        "--diff-filter=d",
+        "--find-renames",
+        base,
+        "--",
+        cwd=root,
+    )
+    return {
+        os.path.realpath(os.path.join(root, path)): ranges
+        for path, ranges in parse_diff(diff).items()
+    }
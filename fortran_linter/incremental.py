@@ -0,0 +1,174 @@
+"""Incremental re-linting of edited buffers.
+
+The indenter is the only state carried from one line to the next: given the
+state before a line, the indentation, corrections and errors of the line only
+depend on its content. :class:`IncrementalLinter` saves the state at regular
+intervals (checkpoints). After an edit, it resumes from the last checkpoint
+before the edit and stops re-checking as soon as the state after the edit
+matches the one saved at a checkpoint of the previous run.
+"""
+
+from .main import Diagnostic, FortranRules, IndenterState, LineChecker
+from .source import split_lines
+
+DEFAULT_CHECKPOINT_INTERVAL = 64
+
+
+class IncrementalLinter:
+    """Lint a buffer, then re-lint it cheaply after each edit.
+
+    Parameters
+    ----------
+    text : str
+        The initial content of the buffer. It is split into lines as when
+        reading a file (see :func:`.source.split_lines`), so that the line
+        numbers match those of the CLI.
+    filename : str, optional
+        The name of the buffer.
+    linelen, indent_size : int
+        The maximum line length and the indentation size.
+    rules : FortranRules, optional
+        Pre-built rules, overriding ``linelen`` (see :class:`.main.LineChecker`).
+    checkpoint_interval : int
+        Number of lines between two saved states of the indenter.
+    """
+
+    filename: str
+    checkpoint_interval: int
+    lines: list[str]
+    corrected_lines: list[str]
+    line_errors: list[list[Diagnostic]]
+    line_modifcounts: list[int]
+    checkpoints: dict[int, IndenterState]
+
+    def __init__(
+        self,
+        text: str,
+        filename: str = "<buffer>",
+        linelen: int = 120,
+        indent_size: int = 4,
+        checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+        *,
+        rules: FortranRules | None = None,
+    ):
+        self.filename = filename
+        self.checkpoint_interval = checkpoint_interval
+        self._checker = LineChecker(
+            filename, linelen=linelen, indent_size=indent_size, rules=rules, stream=True
+        )
+        self.lines = []
+        self.corrected_lines = []
+        self.line_errors = []
+        self.line_modifcounts = []
+        self.checkpoints = {0: self._checker.indenter.state}
+        self.update(0, 0, split_lines(text))
+
+    @property
+    def errcount(self) -> int:
+        return sum(len(errors) for errors in self.line_errors)
+
+    @property
+    def modifcount(self) -> int:
+        return sum(self.line_modifcounts)
+
+    def diagnostics(self) -> list[dict]:
+        """Return the errors, as dicts with a line, column, rule and message."""
+        return [
+            {
+                "line": i + 1,
+                "column": error.column,
+                "rule": error.rule,
+                "message": error.message,
+            }
+            for i, errors in enumerate(self.line_errors)
+            for error in errors
+        ]
+
+    def corrected_text(self) -> str:
+        return "".join(self.corrected_lines)
+
+    def set_text(self, text: str) -> tuple[int, int]:
+        """Replace the whole content, re-checking only the lines that differ.
+
+        Returns
+        -------
+        The range of lines that have been re-checked, see :meth:`update`.
+        """
+        new_lines = split_lines(text)
+        old_lines = self.lines
+        nmax = min(len(old_lines), len(new_lines))
+        prefix = 0
+        while prefix < nmax and old_lines[prefix] == new_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while (
+            suffix < nmax - prefix
+            and old_lines[len(old_lines) - 1 - suffix]
+            == new_lines[len(new_lines) - 1 - suffix]
+        ):
+            suffix += 1
+        return self.update(
+            prefix, len(old_lines) - suffix, new_lines[prefix : len(new_lines) - suffix]
+        )
+
+    def update(self, start: int, end: int, new_lines: list[str]) -> tuple[int, int]:
+        """Replace lines ``start`` to ``end`` (excluded) by ``new_lines``.
+
+        Returns
+        -------
+        The range of lines (0-based, end excluded) that have been re-checked.
+        """
+        delta = len(new_lines) - (end - start)
+        old_nlines = len(self.lines)
+        self.lines[start:end] = new_lines
+        placeholder = [None] * len(new_lines)
+        self.corrected_lines[start:end] = placeholder  # type: ignore[assignment]
+        self.line_errors[start:end] = placeholder  # type: ignore[assignment]
+        self.line_modifcounts[start:end] = [0] * len(new_lines)
+
+        # Checkpoints after the edit are still valid, once shifted. We can stop
+        # as soon as the new state matches one of them.
+        resume = max(i for i in self.checkpoints if i <= start)
+        previous = {
+            i + delta: state
+            for i, state in self.checkpoints.items()
+            if end <= i < old_nlines
+        }
+        self.checkpoints = {
+            i: state for i, state in self.checkpoints.items() if i <= resume
+        }
+
+        indenter = self._checker.indenter
+        indenter.state = self.checkpoints[resume]
+        # Replay the unchanged lines until the edit, to recover the state
+        for i in range(resume, start):
+            if i % self.checkpoint_interval == 0:
+                self.checkpoints[i] = indenter.state
+            indenter.indent_line(self.lines[i])
+
+        edit_end = start + len(new_lines)
+        stop = len(self.lines)
+        for i in range(start, len(self.lines)):
+            state = indenter.state
+            if i >= edit_end and previous.get(i) == state:
+                stop = i
+                break
+            if i % self.checkpoint_interval == 0:
+                self.checkpoints[i] = state
+            self._check_line(i)
+
+        # The remaining checkpoints have been computed in the previous run
+        self.checkpoints.update((i, s) for i, s in previous.items() if i >= stop)
+        return start, stop
+
+    def _check_line(self, i: int) -> None:
+        lc = self._checker
+        original_line = self.lines[i]
+        line = lc.indenter.indent_line(original_line)
+        lc.errors = []
+        modifcount = lc.modifcount
+        self.corrected_lines[i] = lc.check_line(
+            i + 1, original_line, line, *lc.context(lc.indenter.info)
+        )
+        self.line_errors[i] = lc.errors
+        self.line_modifcounts[i] = lc.modifcount - modifcount
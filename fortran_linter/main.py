@@ -1,8 +1,18 @@
+import io
 import logging
 import re
-from collections.abc import Callable, Iterator
-
-logging.basicConfig(filename="myapp.log", level=logging.DEBUG)
+import time
+from bisect import bisect_right
+from collections.abc import Callable, Container, Iterable, Iterator
+from itertools import accumulate, repeat, tee
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from typing import NamedTuple
+
+from .source import DEFAULT_ENCODING, read_lines, split_lines
+from .timeout import Deadline, DeadlineError
+
+logger = logging.getLogger(__name__)
 re_strings = re.compile(r"([\"']).*?\1")
 
 
@@ -25,6 +35,54 @@ BASERULE_T = tuple[re.Pattern, str | Callable[[str, re.Match], str] | None, str
 RULE_T = BASERULE_T | list[BASERULE_T]
 
 
+WRITE_STATEMENT_RE = r"""
+    write\s*\(
+        \s*(?P<left_arg>\w+|\*)\s*,
+        \s*(?P<right_arg>
+            \*|
+            '(\\'|[^'])*'|
+            "(\\"|[^"])*"
+        )\s*\)
+        \s*
+"""
+
+
+# Pattern constructs which may match a newline (or the ends of the text)
+_NEWLINE_CONSTRUCTS = re.compile(r"\\[sWDnrZAxuUN0]|\[\^")
+
+
+def _is_line_local(rule: RULE_T) -> bool:
+    """Whether a rule finds the same matches in a whole file as line by line.
+
+    This is the case when its matches cannot contain a newline: ``^``, ``$``
+    (with :data:`re.M`) and the look-arounds then see a newline at the ends of
+    each line, as they see the ends of the text on a single line. The check is
+    conservative and rejects any construct that may match a newline. Callable
+    corrections receive the match, so they run line by line.
+    """
+    if isinstance(rule, list):
+        return False
+    regexp, correction, _ = rule
+    return (
+        not callable(correction)
+        and not regexp.flags & (re.S | re.X)
+        and _NEWLINE_CONSTRUCTS.search(regexp.pattern) is None
+    )
+
+
+class BufferRule(NamedTuple):
+    """A rule, or group of rules, as run by :meth:`LineChecker.check_buffer`."""
+
+    rule: RULE_T
+    # For each rule (of the group): if it is line-local, its pattern compiled
+    # with re.M to run over the whole file, and also with re.A for ASCII
+    # files, on which it finds the same matches faster; then its triggers
+    # (see `FortranRules.candidates`), None if it has none
+    members: tuple[
+        tuple[re.Pattern | None, re.Pattern | None, tuple[str, ...] | None], ...
+    ]
+
+
 class FortranRules:
     _rules: list[RAW_RULE_T] = [
         # Fix "real*4" to "real(4)"
@@ -107,8 +165,12 @@ class FortranRules:
         [
             # Remove lines starting with a !$
             (r"!\$", None, None),
+            # "\w+" is only tried at the start of words and after a previous
+            # match (which ends with "[ =]omp_"), where the first match in a
+            # word starts anyway: trying it everywhere in long words takes
+            # quadratic time
             (
-                r"(call |\w+ ?= ?|(?!\w))omp_",
+                r"(call |(?:(?<!\w)|(?<=[ =]omp_))\w+ ?= ?|(?!\w))omp_",
                 r"!$ \1",
                 "Should prepend OpenMP calls with !$",
             ),
@@ -133,23 +195,108 @@ class FortranRules:
         (
             # matches write(x..........x, y...........y)
             #                 left_arg      right_arg
-            r"""
-            write\s*\(
-                \s*(?P<left_arg>\w+|\*)\s*,
-                \s*(?P<right_arg>
-                    \*|
-                    '(\\'|[^'])*'|
-                    "(\\"|[^"])*"
-                )\s*\)
-                \s*
-            """,
+            WRITE_STATEMENT_RE,
             r"write(\g<left_arg>, \g<right_arg>) ",
             "Missing space after print*",
             re.VERBOSE,
         ),
     ]
 
+    # Literal substrings, at least one of which must appear in a (lowercased)
+    # line for the rule to possibly match. Rules without triggers always run.
+    _triggers: dict[str, tuple[str, ...]] = {
+        r"\b({types})\*(\w+)": ("*",),
+        r"do (\w+)=(\S+),(\S+)": ("do ",),
+        r"(\w|\))({operators})": (".", "=", "<", ">", "+", "-", "*", "/"),
+        r"({operators})(\w|\()": (".", "=", "<", ">", "+", "-", "*", "/"),
+        r"(\S)::": ("::",),
+        r"::(\S)": ("::",),
+        r"({punctuations})(\w)": (",", ")", ";"),
+        r"\b({types_upper})(\s*\([^\)]+\))?\s*::": ("::",),
+        r"({structs})\(": ("if(", "select(", "case(", "while("),
+        r"^(\s*)use omp_lib": ("use omp_lib",),
+        r"\t": ("\t",),
+        r"(\w)(\!(?!\$)|\!\$)": ("!",),
+        r"(![!>#]?(?:(?=[^\s!>#$]|(\s\s)|\s\$)|\$(?!\S)))\s*(.*)": ("!",),
+        r";\s*$": (";",),
+        r"\#endif": ("#endif",),
+        r"end(if|do|subroutine|function)": (
+            "endif",
+            "enddo",
+            "endsubroutine",
+            "endfunction",
+        ),
+        r"\((kind|len)=": ("(kind=", "(len="),
+        r"write\s*\(.*\)": ("write",),
+        r"open\s*\([^\)]+\)": ("open",),
+        "::": ("::",),
+        r'=(\w|\(|\.|\+|-|\'|")': ("=",),
+        r"(\w|\)|\.)=": ("=",),
+        r"[ \t]+$": (" ", "\t"),
+        r"\(kind\s*=\s*\d\s*\)": ("(kind",),
+        r"\(\\([^\)]*)\\\)": ("(\\",),
+        r"!\$": ("!$",),
+        r"(call |(?:(?<!\w)|(?<=[ =]omp_))\w+ ?= ?|(?!\w))omp_": ("omp_",),
+        r'include ["\']mpif.h[\'"]': ("mpif.h",),
+        r"\.eq\.": (".eq.",),
+        r"\.ne\.": (".ne.",),
+        r"\.gt\.": (".gt.",),
+        r"\.ge\.": (".ge.",),
+        r"\.geq\.": (".geq.",),
+        r"\.lt\.": (".lt.",),
+        r"\.le\.": (".le.",),
+        r"\.leq\.": (".leq.",),
+        r"print\s*\*\s*,\s*": ("print",),
+        WRITE_STATEMENT_RE: ("write",),
+    }
+
+    # Stable identifier of each rule, or group of rules (keyed by the pattern
+    # of its last rule). The letter is the category: S for spacing, C for
+    # comments, W for whitespace, L for the line length, M for modern syntax
+    # and P for portability.
+    _ids: dict[str, str] = {
+        r"\b({types})\*(\w+)": "M001",
+        r"do (\w+)=(\S+),(\S+)": "S001",
+        r"(\w|\))({operators})": "S002",
+        r"({operators})(\w|\()": "S003",
+        r"(\S)::": "S004",
+        r"::(\S)": "S005",
+        r"({punctuations})(\w)": "S006",
+        r"\b({types_upper})(\s*\([^\)]+\))?\s*::": "M002",
+        r"({structs})\(": "S007",
+        r"^(\s*)use omp_lib": "P001",
+        r"^.{linelen_re}.+$": "L001",
+        r"\t": "W001",
+        r"(\w)(\!(?!\$)|\!\$)": "C001",
+        r"(![!>#]?(?:(?=[^\s!>#$]|(\s\s)|\s\$)|\$(?!\S)))\s*(.*)": "C002",
+        r";\s*$": "W002",
+        r"end(if|do|subroutine|function)": "S008",
+        r'=(\w|\(|\.|\+|-|\'|")': "S009",
+        r"(\w|\)|\.)=": "S010",
+        r"[ \t]+$": "W003",
+        r"\(kind\s*=\s*\d\s*\)": "M003",
+        r"\(\\([^\)]*)\\\)": "M004",
+        r"(call |(?:(?<!\w)|(?<=[ =]omp_))\w+ ?= ?|(?!\w))omp_": "P002",
+        r'include ["\']mpif.h[\'"]': "M005",
+        r"\.eq\.": "M101",
+        r"\.ne\.": "M102",
+        r"\.gt\.": "M103",
+        r"\.ge\.": "M104",
+        r"\.geq\.": "M105",
+        r"\.lt\.": "M106",
+        r"\.le\.": "M107",
+        r"\.leq\.": "M108",
+        r"print\s*\*\s*,\s*": "S011",
+        WRITE_STATEMENT_RE: "S012",
+    }
+
     rules: list[RULE_T]
+    buffer_rules: list[BufferRule]
+    names: dict[BASERULE_T, str]
+    ids: dict[BASERULE_T, str]
+    enabled: list[str]
+    triggers: dict[str, set[re.Pattern]]
+    unconditional: set[re.Pattern]
 
     types = [r"real", r"character", r"logical", r"integer"]
     operators = [
@@ -181,8 +328,35 @@ class FortranRules:
 
     lineline: int
 
-    def __init__(self, linelen: int = 120):
+    def __init__(
+        self,
+        linelen: int = 120,
+        select: Iterable[str] | None = None,
+        ignore: Iterable[str] = (),
+    ):
+        """Compile the rules.
+
+        Parameters
+        ----------
+        linelen : int
+            The maximum line length.
+        select, ignore : iterable of str, optional
+            Only compile the rules whose ID starts with one of the ``select``
+            prefixes (all by default) and with none of the ``ignore`` ones,
+            e.g. ``ignore=["M1", "M005"]``.
+
+        Raises
+        ------
+        ValueError
+            If a prefix does not match any rule.
+        """
         self.linelen = linelen
+        select = None if select is None else [code.upper() for code in select]
+        ignore = [code.upper() for code in ignore]
+        known = list(self._ids.values())
+        for code in [*(select or []), *ignore]:
+            if not any(rule_id.startswith(code) for rule_id in known):
+                raise ValueError(f"Unknown rule {code!r}")
         operators_re = r"|".join(self.operators)
         types_re = r"|".join(self.types)
         struct_re = r"|".join(self.structs)
@@ -198,12 +372,86 @@ class FortranRules:
             "linelen": f"{self.linelen}",
         }
 
-        self.rules = [self.format_rule(rule, fmt) for rule in self._rules]
+        self.names = {}
+        self.ids = {}
+        self.triggers = {}
+        self.unconditional = set()
+        self.rules = []
+        self.buffer_rules = []
+        self.enabled = []
+        # Drop the deselected rules before compiling them
+        for rule in self._rules:
+            rule_id = self.rule_id(rule)
+            if (select is None or rule_id.startswith(tuple(select))) and not (
+                rule_id.startswith(tuple(ignore))
+            ):
+                compiled = self.format_rule(rule, fmt, rule_id)
+                self.rules.append(compiled)
+                self.buffer_rules.append(self.buffer_rule(rule, compiled))
+                self.enabled.append(rule_id)
+
+    @classmethod
+    def rule_id(cls, rule: RAW_RULE_T) -> str:
+        """Return the ID of a rule, or of a group of rules."""
+        pattern = rule[-1][0] if isinstance(rule, list) else rule[0]
+        return cls._ids[pattern]
 
     def get(self) -> list[RULE_T]:
         return self.rules
 
-    def format_rule(self, rule: RAW_RULE_T, fmt: dict) -> RULE_T:
+    def buffer_rule(self, rule: RAW_RULE_T, compiled: RULE_T) -> BufferRule:
+        """Describe how to run a top-level rule over a whole file."""
+        raw_members = rule if isinstance(rule, list) else [rule]
+        compiled_members = compiled if isinstance(compiled, list) else [compiled]
+        members = []
+        for raw, member in zip(raw_members, compiled_members, strict=True):
+            multiline = ascii_multiline = None
+            if _is_line_local(member):
+                pattern, flags = member[0].pattern, member[0].flags | re.M
+                multiline = re.compile(pattern, flags)
+                ascii_multiline = re.compile(pattern, flags & ~re.U | re.A)
+            members.append((multiline, ascii_multiline, self._triggers.get(raw[0])))
+        return BufferRule(compiled, tuple(members))
+
+    def candidates(self, line: str) -> set[re.Pattern] | None:
+        """Return the rules that may match a line.
+
+        Parameters
+        ----------
+        line : str
+            The line to check.
+
+        Returns
+        -------
+        set of the compiled patterns that may match, or None if any rule may
+        match (the triggers are only reliable for ASCII lines).
+        """
+        if not line.isascii():
+            return None
+        lowered = line.lower()
+        found = set(self.unconditional)
+        for trigger, patterns in self.triggers.items():
+            if trigger in lowered:
+                found.update(patterns)
+        return found
+
+    def fingerprint(self) -> str:
+        """Return a string identifying the compiled rules.
+
+        Two rule sets with the same fingerprint yield the same results.
+        """
+
+        def describe(rule: RULE_T) -> str:
+            if isinstance(rule, list):
+                return "[" + ",".join(describe(r) for r in rule) + "]"
+            regexp, correction, msg = rule
+            if callable(correction):
+                correction = f"{correction.__module__}.{correction.__qualname__}"
+            return repr((regexp.pattern, regexp.flags, correction, msg))
+
+        return ",".join(describe(rule) for rule in self.rules)
+
+    def format_rule(self, rule: RAW_RULE_T, fmt: dict, rule_id: str) -> RULE_T:
         if isinstance(rule, tuple):
             rxp, replacement, msg = rule[:3]
             if len(rule) == 4:
@@ -213,13 +461,37 @@ class FortranRules:
 
             msg = msg.format(**fmt) if msg is not None else None
             regexp = re.compile(rxp.format(**fmt), flags)
-            return (regexp, replacement, msg)
+            triggers = self._triggers.get(rxp)
+            if triggers is None:
+                self.unconditional.add(regexp)
+            else:
+                for trigger in triggers:
+                    self.triggers.setdefault(trigger, set()).add(regexp)
+            compiled = (regexp, replacement, msg)
+            # Rules without message only skip lines, name them after their pattern
+            self.names[compiled] = msg or " ".join(regexp.pattern.split())
+            self.ids[compiled] = rule_id
+            return compiled
         elif isinstance(rule, list):
-            return [self.format_rule(r, fmt) for r in rule]  # type: ignore
+            return [self.format_rule(r, fmt, rule_id) for r in rule]  # type: ignore
         else:
             raise NotImplementedError
 
 
+@lru_cache
+def get_rules(
+    linelen: int = 120,
+    select: frozenset[str] | None = None,
+    ignore: frozenset[str] = frozenset(),
+) -> FortranRules:
+    """Return the compiled rules for a configuration.
+
+    The rules are compiled once per process and shared between all callers.
+    See :class:`FortranRules` for the parameters.
+    """
+    return FortranRules(linelen=linelen, select=select, ignore=ignore)
+
+
 INDENTER_RULES = (
     re.compile(
         r"\b(if.*then|do|select|while|subroutine|function|module(?!\s*procedure)|interface)\b",
@@ -301,16 +573,19 @@ def in_string(
         The line to check.
     span : Tuple[int, int]
         The span to check.
+    string_spans : list of Tuple[int, int]
+        The sorted, non-overlapping spans of the strings of the line.
 
     Returns
     -------
     bool, True if the span if *fully* contained in a string
     """
-    for start, end in string_spans:
-        if start <= span[0] < span[1] < end:
-            return True
-
-    return False
+    # Only the last string starting before the span can contain it
+    i = bisect_right(string_spans, span[0], key=itemgetter(0)) - 1
+    if i < 0:
+        return False
+    start, end = string_spans[i]
+    return start <= span[0] < span[1] < end
 
 
 def comment_location(line: str) -> int:
@@ -326,87 +601,414 @@ def comment_location(line: str) -> int:
     int: location of the comment-opening character or
          len(line) if the line does not end with a comment.
     """
-    if line.strip().startswith("#"):
-        return line.index("#")
+    return LineTokens(line).comment_start
+
+
+class LineTokens:
+    """Lexical structure of a line: strings and comment.
+
+    Each piece is computed on first access and then reused, so that the
+    indenter and all the rules share a single lexing of the line.
+    """
+
+    __slots__ = ("line", "_string_spans", "_comment_start", "_strings", "_literals")
+
+    line: str
+
+    def __init__(self, line: str):
+        self.line = line
+        self._string_spans: list[tuple[int, int]] | None = None
+        self._comment_start: int | None = None
+        self._strings: list[str] | None = None
+        self._literals: list[tuple[int, int]] | None = None
+
+    @property
+    def string_spans(self) -> list[tuple[int, int]]:
+        """The spans of the strings, as found by :func:`string_locations`."""
+        if self._string_spans is None:
+            self._string_spans = list(string_locations(self.line))
+        return self._string_spans
+
+    @property
+    def comment_start(self) -> int:
+        """See :func:`comment_location`."""
+        if self._comment_start is None:
+            self._comment_start = self._find_comment()
+        return self._comment_start
+
+    @property
+    def code(self) -> str:
+        """The line, without its comment."""
+        return self.line[: self.comment_start]
+
+    @property
+    def strings(self) -> list[str]:
+        """The content of the quoted strings, used to check that corrections do
+        not modify any string."""
+        if self._strings is None:
+            self._lex_strings()
+        return self._strings  # type: ignore[return-value]
+
+    @property
+    def literals(self) -> list[tuple[int, int]]:
+        """The spans of :attr:`strings`."""
+        if self._literals is None:
+            self._lex_strings()
+        return self._literals  # type: ignore[return-value]
+
+    def _lex_strings(self) -> None:
+        matches = list(re_strings.finditer(self.line))
+        self._strings = [m[0] for m in matches]
+        self._literals = [m.span() for m in matches]
+
+    def replace(self, start: int, end: int, fix: str) -> "LineTokens":
+        """Return the tokens of the line with ``line[start:end]`` replaced by
+        ``fix``, which must not touch a literal (see :meth:`touches_literal`).
+
+        The strings are carried over rather than lexed again.
+        """
+        tokens = LineTokens(self.line[:start] + fix + self.line[end:])
+        delta = len(fix) - (end - start)
+        tokens._strings = self.strings
+        tokens._literals = [
+            (s, e) if e <= start else (s + delta, e + delta) for s, e in self.literals
+        ]
+        return tokens
+
+    def touches_literal(self, start: int, end: int) -> bool:
+        """Whether ``line[start:end]`` overlaps or contains a string literal,
+        or could pair with a quote of the rest of the line."""
+        part = self.line[start:end]
+        if "'" in part or '"' in part or "\n" in part:
+            return True
+        return any(s < end and start < e for s, e in self.literals)
+
+    def in_string(self, span: tuple[int, int]) -> bool:
+        return in_string(self.line, span, self.string_spans)
+
+    def _find_comment(self) -> int:
+        line = self.line
+        if line.strip().startswith("#"):
+            return line.index("#")
+
+        # We find the location of all '!' and verify we are not in a string
+        for match in COMMENT_MARK_DETECTOR.finditer(line):
+            span = match.span()
+
+            if not self.in_string(span):
+                return span[0]
+
+        return len(line)
+
+
+def _find(tokens: LineTokens, rules: tuple[re.Pattern, ...]) -> re.Match | None:
+    """Return the first match of the rules in the code of a line, not fully in
+    a string."""
+    comment_pos = tokens.comment_start
+    for rule in rules:
+        for match in rule.finditer(tokens.line):
+            span = match.span()
+            if span[1] <= comment_pos and not tokens.in_string(span):
+                return match
+    return None
+
+
+# Literal substrings, one of which must appear in a (lowercased, ASCII) line
+# for the structure rules to possibly match
+_OPENING_TRIGGERS = (
+    "if",
+    "do",
+    "select",
+    "while",
+    "subroutine",
+    "function",
+    "module",
+    "interface",
+)
+_IMMEDIATE_DEDENTER_TRIGGERS = ("contains", "else")
+
+# Regions of a file that can be skipped by the rules, see `StatementBuilder`
+REGIONS = ("markers", "preprocessor", "data")
+DEFAULT_SKIP_REGIONS = frozenset({"markers"})
+REGION_MARKER_RE = re.compile(r"!\s*fortran-linter:\s*(off|on)\b", re.I)
+CONDITIONAL_DIRECTIVE_RE = re.compile(r"#\s*(if|ifdef|ifndef|endif)\b")
+DATA_STATEMENT_RE = re.compile(r"^\s*(\d+\s+)?data\b", re.I)
+
+StructureState = tuple[bool, str | None, bool, tuple[str, ...], bool, int]
+
+
+def _opens_table(code: str) -> bool:
+    """Whether the first line of a statement starts a table of values, i.e. a
+    data statement or an array constructor continued on the next lines."""
+    return (
+        DATA_STATEMENT_RE.match(code) is not None
+        or code.count("(/") > code.count("/)")
+        or code.count("[") > code.count("]")
+    )
+
+
+class LineInfo:
+    """Structure of a physical line, as classified by :class:`StatementBuilder`.
+
+    Attributes
+    ----------
+    tokens : LineTokens
+        The lexed line.
+    label : re.Match or None
+        The statement label the line starts with.
+    opening : re.Match or None
+        The keyword opening a block (see ``INDENTER_RULES``).
+    closes : bool
+        Whether the line closes a block (see ``DEDENTER_RULES``).
+    dedents : bool
+        Whether the line sits between two parts of a block, e.g. ``else``.
+    continues : bool
+        Whether the statement is continued on the next line.
+    continued : bool
+        Whether the line continues the statement of the previous line.
+    head : str or None
+        For continued lines, the code of the first line of the statement.
+    scopes : tuple of str
+        The constructs (``do``, ``if``, ``module``...) enclosing the line.
+    directive : bool
+        Whether the line is a preprocessor directive. Directives are not part
+        of the statements and are not classified further.
+    regions : tuple of str
+        The kinds of regions the line is in, see :class:`StatementBuilder`.
+    """
 
-    string_spans = list(string_locations(line))
-    # We find the location of all '!' and verify we are not in a string
-    for match in COMMENT_MARK_DETECTOR.finditer(line):
-        span = match.span()
+    __slots__ = (
+        "tokens",
+        "label",
+        "opening",
+        "closes",
+        "dedents",
+        "continues",
+        "continued",
+        "head",
+        "scopes",
+        "directive",
+        "regions",
+    )
+
+    def __init__(self, tokens: LineTokens):
+        self.tokens = tokens
+        self.label: re.Match | None = None
+        self.opening: re.Match | None = None
+        self.closes = False
+        self.dedents = False
+        self.continues = False
+        self.continued = False
+        self.head: str | None = None
+        self.scopes: tuple[str, ...] = ()
+        self.directive = False
+        self.regions: tuple[str, ...] = ()
+
+
+class StatementBuilder:
+    """Single-pass structural model of a file.
+
+    Each line is lexed once and classified, then grouped with the lines it
+    continues into a logical statement, while the enclosing constructs are
+    tracked on a stack. The indenter and the rules both query the resulting
+    :class:`LineInfo` instead of scanning the line again.
+
+    The builder also tracks the regions (see :data:`REGIONS`) that the rules
+    may skip as a whole:
+
+    ``markers``
+        The lines from a ``! fortran-linter: off`` comment to the next
+        ``! fortran-linter: on`` comment.
+    ``preprocessor``
+        The lines from an ``#if``, ``#ifdef`` or ``#ifndef`` directive to the
+        matching ``#endif``.
+    ``data``
+        The continuation lines of data statements and of array constructors,
+        e.g. generated tables of values.
+    """
 
-        if not in_string(line, span, string_spans):
-            return span[0]
+    continuation: bool
+    head: str | None
+    table: bool
+    scopes: tuple[str, ...]
+    disabled: bool
+    conditionals: int
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset the state, before a new file."""
+        self.continuation = False
+        self.head = None
+        self.table = False
+        self.scopes = ()
+        self.disabled = False
+        self.conditionals = 0
+
+    @property
+    def state(self) -> StructureState:
+        """The state carried from one line to the next."""
+        return (
+            self.continuation,
+            self.head,
+            self.table,
+            self.scopes,
+            self.disabled,
+            self.conditionals,
+        )
 
-    return len(line)
+    @state.setter
+    def state(self, state: StructureState) -> None:
+        (
+            self.continuation,
+            self.head,
+            self.table,
+            self.scopes,
+            self.disabled,
+            self.conditionals,
+        ) = state
+
+    def feed(self, line: str) -> LineInfo:
+        """Classify the next line of the file."""
+        info = LineInfo(LineTokens(line))
+        if line.startswith("#"):
+            return self._feed_directive(info)
+        tokens = info.tokens
+
+        # Cheap scans for the keywords, only reliable for ASCII lines
+        lowered = line.lower() if line.isascii() else None
+
+        def may_contain(*triggers: str) -> bool:
+            return lowered is None or any(t in lowered for t in triggers)
+
+        if line[:1].isdigit():
+            info.label = _find(tokens, LABEL_RULES)
+        if may_contain(*_IMMEDIATE_DEDENTER_TRIGGERS) and _find(
+            tokens, IMMEDIATE_DEDENTER_RULES
+        ):
+            info.dedents = True
+        elif may_contain("end") and _find(tokens, DEDENTER_RULES):
+            info.closes = True
+        elif may_contain(*_OPENING_TRIGGERS):
+            info.opening = _find(tokens, INDENTER_RULES)
+        info.continues = "&" in line and bool(_find(tokens, CONTINUATION_LINE_RULES))
+
+        info.continued = self.continuation
+        info.head = self.head
+        info.scopes = self.scopes
+        in_table = info.continued and self.table
+
+        # Logical statement
+        if not info.continues:
+            self.head = None
+            self.table = False
+        elif not info.continued:
+            self.head = tokens.code
+            self.table = _opens_table(self.head)
+        self.continuation = info.continues
+
+        # Enclosing constructs
+        if info.closes:
+            self.scopes = self.scopes[:-1]
+        elif info.opening is not None:
+            keyword = info.opening.group(1).lower()
+            if keyword.startswith("if"):
+                keyword = "if"
+            self.scopes = (*self.scopes, keyword)
+
+        # Regions, including the lines of the markers themselves
+        marker = None
+        if may_contain("fortran-linter"):
+            marker = REGION_MARKER_RE.search(line, tokens.comment_start)
+        if marker is not None and marker.group(1).lower() == "off":
+            self.disabled = True
+        info.regions = self._regions()
+        if in_table:
+            info.regions = (*info.regions, "data")
+        if marker is not None and marker.group(1).lower() == "on":
+            self.disabled = False
+
+        return info
+
+    def _feed_directive(self, info: LineInfo) -> LineInfo:
+        """Classify a preprocessor line, which does not belong to statements."""
+        info.directive = True
+        match = CONDITIONAL_DIRECTIVE_RE.match(info.tokens.line)
+        is_end = match is not None and match.group(1) == "endif"
+        if match is not None and not is_end:
+            self.conditionals += 1
+        info.regions = self._regions()
+        if is_end:
+            self.conditionals = max(0, self.conditionals - 1)
+        return info
+
+    def _regions(self) -> tuple[str, ...]:
+        if self.disabled:
+            return ("markers", "preprocessor") if self.conditionals else ("markers",)
+        return ("preprocessor",) if self.conditionals else ()
+
+
+IndenterState = tuple[int, StructureState]
+_NO_CONTEXT: tuple[str | None, str | None] = (None, None)
 
 
 class Indenter:
     Nindent: int
     current_line_indent: int = 0
-    continuation_line: bool = False
+    structure: StatementBuilder
+    info: LineInfo | None
 
     def __init__(self, nindent: int):
         self.Nindent = nindent
+        self.structure = StatementBuilder()
+        self.info = None
 
-    def checker(
-        self,
-        line: str,
-        rules: tuple[re.Pattern, ...],
-        comment_pos: int,
-        string_spans: list[tuple[int, int]],
-        return_matches: list[re.Match] | None = None,
-    ) -> bool | tuple[bool, re.Match | None]:
-        for rule in rules:
-            for match in rule.finditer(line):
-                span = match.span()
-                if span[1] <= comment_pos and not in_string(line, span, string_spans):
-                    if return_matches is not None:
-                        return_matches.append(match)
-                    return True
+    def reset(self) -> None:
+        """Reset the state, before indenting a new file."""
+        self.current_line_indent = 0
+        self.structure.reset()
+        self.info = None
 
-        return False
+    @property
+    def state(self) -> IndenterState:
+        """The state carried from one line to the next, which can be saved and
+        restored to resume indenting from a given line."""
+        return self.current_line_indent, self.structure.state
+
+    @state.setter
+    def state(self, state: IndenterState) -> None:
+        self.current_line_indent, self.structure.state = state
 
     def indent_line(self, line: str) -> str:
-        if line.startswith("#"):
+        """Indent the next line of the file.
+
+        Its structure is then available as :attr:`info`. Preprocessor lines
+        are left as they are.
+        """
+        info = self.info = self.structure.feed(line)
+        if info.directive:
             return line
 
-        comment_pos = comment_location(line)
         next_line_indent = self.current_line_indent
-        string_spans = list(string_locations(line))
-        curline_continuation = False
 
         indent = False
         dedent = False
         cur_line_shift = 0
 
-        label_matches: list[re.Match] = []
-        has_label = self.checker(
-            line, LABEL_RULES, comment_pos, string_spans, return_matches=label_matches
-        )
-        indent_matches: list[re.Match] = []
-
-        if self.checker(line, IMMEDIATE_DEDENTER_RULES, comment_pos, string_spans):
+        if info.dedents:
             cur_line_shift = self.Nindent
-        elif self.checker(line, DEDENTER_RULES, comment_pos, string_spans):
+        elif info.closes:
             cur_line_shift = self.Nindent
             dedent = True
-        elif self.checker(
-            line,
-            INDENTER_RULES,
-            comment_pos,
-            string_spans,
-            return_matches=indent_matches,
-        ):
+        elif info.opening is not None:
             indent = True
-        if self.checker(line, CONTINUATION_LINE_RULES, comment_pos, string_spans):
-            curline_continuation = True
 
         # If we were in a continuation line previously but are not anymore
-        if not self.continuation_line and curline_continuation:
+        if not info.continued and info.continues:
             indent = True
-        elif self.continuation_line and not curline_continuation:
+        elif info.continued and not info.continues:
             dedent = True
-        self.continuation_line = curline_continuation
 
         if indent:
             next_line_indent += self.Nindent
@@ -415,17 +1017,15 @@ class Indenter:
 
         # Treat the case where the line defines a function / module / subroutine
         # and ends with a continuation line
-        if indent_matches and curline_continuation:
-            match = indent_matches[0]
-            if match.group(1).lower() in ("function", "module", "subroutine"):
+        if info.opening is not None and info.continues:
+            if info.opening.group(1).lower() in ("function", "module", "subroutine"):
                 next_line_indent += self.Nindent
 
         # Treat the case where the line starts with a label
-        if has_label:
-            match = label_matches[0]
-            label_str = match.group(0)
+        if info.label is not None:
+            label_str = info.label.group(0)
             prefix = label_str + " "
-            line = line[match.end() :]
+            line = line[info.label.end() :]
         else:
             prefix = ""
         prefix = prefix.ljust(max(0, self.current_line_indent - cur_line_shift))
@@ -439,8 +1039,104 @@ class Indenter:
 
         return new_line
 
+    def indent_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        """Lazily indent lines, one at a time."""
+        for line in lines:
+            yield self.indent_line(line)
+
     def __call__(self, lines: list[str]) -> list[str]:
-        return [self.indent_line(line) for line in lines]
+        return list(self.indent_lines(lines))
+
+
+class RuleCounter:
+    """Counters for a single rule."""
+
+    __slots__ = ("time", "lines", "skipped", "matches", "applied", "rejected")
+
+    FIELDS = __slots__
+
+    def __init__(self) -> None:
+        self.time = 0.0
+        self.lines = 0
+        self.skipped = 0
+        self.matches = 0
+        self.applied = 0
+        self.rejected = 0
+
+
+class RuleStats:
+    """Per-rule statistics, aggregated over lines and files.
+
+    For each rule (by name, see :attr:`FortranRules.names`), this records the
+    time spent matching, the number of lines scanned and skipped by the
+    prefilter, the number of matches outside comments, and the number of
+    corrections applied and rejected because they would modify a string.
+    """
+
+    counters: dict[str, RuleCounter]
+
+    def __init__(self) -> None:
+        self.counters = {}
+
+    def __getitem__(self, name: str) -> RuleCounter:
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = RuleCounter()
+        return counter
+
+    def merge(self, other: "RuleStats") -> None:
+        for name, counter in other.counters.items():
+            mine = self[name]
+            for field in RuleCounter.FIELDS:
+                setattr(mine, field, getattr(mine, field) + getattr(counter, field))
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        """Return the counters, most time-consuming rule first."""
+        ordered = sorted(self.counters.items(), key=lambda kv: -kv[1].time)
+        return {
+            name: {field: getattr(counter, field) for field in RuleCounter.FIELDS}
+            for name, counter in ordered
+        }
+
+
+class Diagnostic(NamedTuple):
+    """An error found by a rule.
+
+    The lines are stored as they are, including their newline, so that
+    recording a diagnostic does not copy them. ``rule`` is the ID of the rule
+    (see :attr:`FortranRules.ids`). See :mod:`.output` to render diagnostics.
+    """
+
+    filename: str
+    line: int
+    column: int
+    rule: str
+    message: str
+    fix: str | None
+    original_line: str
+
+
+class CheckResult(NamedTuple):
+    """Picklable summary of a :class:`LineChecker` run."""
+
+    filename: str
+    errors: list[Diagnostic]
+    errcount: int
+    modifcount: int
+    corrected_lines: list[str]
+    converged: bool = True
+    # The (1-based) numbers of the lines kept unchanged, to write back as is
+    kept: tuple[int, ...] = ()
+
+
+# Lines shorter than this are checked quickly whatever their content, and are
+# not timed (see `LineChecker.line_timeout`)
+TIMED_LINE_LENGTH = 1000
+
+
+def _as_written(lines: list[str]) -> list[str]:
+    """Return the lines of a file, as written when correcting it in place."""
+    return split_lines("".join(line.rstrip() + "\n" for line in lines))
 
 
 class LineChecker:
@@ -453,7 +1149,22 @@ class LineChecker:
     indenter: Indenter
     errcount: int
     modifcount: int
-    errors: list
+    errors: list[Diagnostic]
+    prefilter: bool
+    stats: RuleStats | None
+    line_filter: Container[int] | None
+    check_only: bool
+    skip_regions: Container[str]
+    max_errors: int
+    whole_file: bool
+    encoding: str
+    line_timeout: float
+    file_timeout: float
+    timed_out: bool
+    kept: set[int]
+    timings: dict[str, float]
+    passes: int
+    converged: bool
 
     def __init__(
         self,
@@ -461,62 +1172,675 @@ class LineChecker:
         print_progress: bool = False,
         linelen: int = 120,
         indent_size: int = 4,
+        *,
+        rules: FortranRules | None = None,
+        indenter: Indenter | None = None,
+        prefilter: bool = True,
+        stats: RuleStats | None = None,
+        stream: bool = False,
+        line_filter: Container[int] | None = None,
+        max_passes: int = 1,
+        check_only: bool = False,
+        text: str | None = None,
+        skip_regions: Container[str] = DEFAULT_SKIP_REGIONS,
+        max_errors: int = -1,
+        whole_file: bool = True,
+        encoding: str = DEFAULT_ENCODING,
+        line_timeout: float = -1,
+        file_timeout: float = -1,
     ):
-        with open(fname) as f:
-            lines = f.readlines()
+        """Check (and correct) a file.
+
+        Parameters
+        ----------
+        fname : str
+            The file to check. With ``text``, only its name is used.
+        linelen, indent_size : int
+            The maximum line length and the indentation size.
+        rules : FortranRules, optional
+            Pre-built rules, overriding ``linelen``. Defaults to the shared
+            rules for ``linelen`` (see :func:`get_rules`).
+        indenter : Indenter, optional
+            Indenter to reuse, overriding ``indent_size``. It is reset first.
+        prefilter : bool, optional
+            Skip the rules that cannot match a line, as decided by a cheap
+            scan for their trigger substrings (see
+            :meth:`FortranRules.candidates`). This does not change the results.
+        stats : RuleStats, optional
+            If given, collect per-rule statistics into it.
+        stream : bool, optional
+            If True, do not read nor check the file: the lines are to be fed
+            to :meth:`iter_check`, which processes them one at a time.
+        line_filter : container of int, optional
+            If given, only check the lines whose (1-based) number is in it.
+            The other lines are still indented, to track the structure of the
+            file, but are kept unchanged and their errors are not reported.
+            The numbers of the lines kept unchanged are recorded in
+            :attr:`kept`.
+        max_passes : int, optional
+            See :meth:`fix_until_stable`.
+        check_only : bool, optional
+            Only collect the errors, do not build :attr:`corrected_lines`.
+        text : str, optional
+            The content of the file, to check it without reading it. Newlines
+            are translated as when reading the file.
+        skip_regions : container of str, optional
+            The kinds of regions (see :data:`REGIONS`) whose lines are kept
+            unchanged, without checking them (see :attr:`kept`). They are
+            counted as skipped in the statistics, as ``<kind region>``.
+        max_errors : int, optional
+            Stop recording errors once this many have been found (-1 for no
+            limit). With ``check_only``, the remaining lines are not checked.
+        whole_file : bool, optional
+            Check the lines rule by rule, running the line-local rules once
+            over the whole file (see :meth:`check_buffer`). This does not
+            change the results. It is not used with ``stats`` nor
+            ``max_errors``, which are tracked line by line.
+        encoding : str, optional
+            The encoding of the file, for its non-ASCII content (see
+            :mod:`.source`). The bytes that do not decode are kept as is.
+        line_timeout, file_timeout : float, optional
+            Give up on the lines, and on the file, whose check takes more than
+            this many seconds (-1 for no limit): they are kept unchanged (see
+            :attr:`kept`), and reported as errors T001 and T002 (see
+            :mod:`.timeout`). Only the lines longer than
+            :data:`TIMED_LINE_LENGTH` characters are timed. With ``stream``,
+            the rest of the file is kept unchanged once its check has taken
+            ``file_timeout``.
+        """
         self.filename = fname
         self.corrected_lines = []
         self.print_progress = print_progress
 
-        self.rules = FortranRules(linelen=linelen)
-        self.indenter = Indenter(indent_size)
+        self.rules = rules if rules is not None else get_rules(linelen)
+        if indenter is None:
+            indenter = Indenter(indent_size)
+        else:
+            indenter.reset()
+        self.indenter = indenter
+        self.prefilter = prefilter
+        self.stats = stats
+        self.line_filter = line_filter
+        self.check_only = check_only
+        self.skip_regions = skip_regions
+        self.max_errors = max_errors
+        self.whole_file = whole_file
+        self.encoding = encoding
+        self.line_timeout = line_timeout
+        self.file_timeout = file_timeout
+        self.timed_out = False
+        self.kept = set()
+        self._deadline = Deadline(-1)
+        self._candidates_line: str | None = None
+        self._candidates: set[re.Pattern] | None = None
+        self._line_tokens: dict[str, LineTokens] = {}
+        self._head: str | None = None
+        self._contexts: list[tuple[str | None, str | None]] = []
 
         self.errcount = 0
         self.modifcount = 0
         self.errors = []
-
+        self.timings = {}
+        self.passes = 1
+        self.converged = True
+        if stream:
+            self.original_lines = self.lines = []
+            return
+
+        tstart = time.perf_counter()
+        if text is None:
+            lines = read_lines(fname, encoding)
+        else:
+            lines = io.StringIO(text, newline=None).readlines()
+        self.timings["read"] = time.perf_counter() - tstart
         self.original_lines = lines
 
         # Indent the lines
-        self.lines = self.indenter(lines)
+        tstart = time.perf_counter()
+        self.lines, self._contexts = self.indent(lines)
+        self.timings["indent"] = time.perf_counter() - tstart
 
         # Check the lines
-        self.check_lines(self.original_lines, self.lines)
+        tstart = time.perf_counter()
+        deadline = Deadline(file_timeout)
+        try:
+            with deadline:
+                self._deadline = deadline
+                self.check_lines(self.original_lines, self.lines, self._contexts)
+                self.timings["check"] = time.perf_counter() - tstart
+                if max_passes > 1:
+                    self.fix_until_stable(max_passes)
+        except DeadlineError as e:
+            if e.deadline is not deadline:
+                raise
+            self.give_up()
+            self.timings["check"] = time.perf_counter() - tstart
+        finally:
+            self._deadline = Deadline(-1)
+
+        logger.debug(
+            "Checked %s: %d errors, %d modifications",
+            fname,
+            self.errcount,
+            self.modifcount,
+        )
 
-    def check_lines(self, original_lines: list[str], lines: list[str]) -> None:
-        for i, (original_line, line) in enumerate(
-            zip(original_lines, lines, strict=False)
-        ):
-            meta = {
-                "line": i + 1,
-                "original_line": original_line.replace("\n", ""),
-                "filename": self.filename,
-            }
-
-            line, _ = self.check_ruleset(
-                line, original_line=original_line, meta=meta, ruleset=self.rules.get()
+    def indent(
+        self, lines: Iterable[str]
+    ) -> tuple[list[str], list[tuple[str | None, str | None]]]:
+        """Indent the lines of a file.
+
+        Returns
+        -------
+        The indented lines, and the context of each line (see :meth:`context`).
+        """
+        indenter = self.indenter
+        indenter.reset()
+        indented = []
+        contexts = []
+        for line in lines:
+            indented.append(indenter.indent_line(line))
+            contexts.append(self.context(indenter.info))
+        return indented, contexts
+
+    def context(self, info: LineInfo | None) -> tuple[str | None, str | None]:
+        """Return the ``head`` and ``region`` of a line, see :meth:`check_line`."""
+        if info is None or (info.head is None and not info.regions):
+            return _NO_CONTEXT
+        region = next((r for r in info.regions if r in self.skip_regions), None)
+        return info.head, region
+
+    def check_lines(
+        self,
+        original_lines: list[str],
+        lines: list[str],
+        contexts: Iterable[tuple[str | None, str | None]] | None = None,
+    ) -> None:
+        if self.whole_file and self.stats is None and self.max_errors <= 0:
+            corrected = self.check_buffer(original_lines, lines, contexts)
+            if not self.check_only:
+                self.corrected_lines.extend(corrected)
+            return
+        if contexts is None:
+            contexts = repeat(_NO_CONTEXT)
+        rows = enumerate(zip(original_lines, lines, contexts, strict=False), start=1)
+        if self.check_only:
+            for lineno, (original_line, line, context) in rows:
+                self.check_line(lineno, original_line, line, *context)
+                if self.exhausted:
+                    break
+            return
+        for lineno, (original_line, line, context) in rows:
+            self.corrected_lines.append(
+                self.check_line(lineno, original_line, line, *context)
+            )
+
+    def check_buffer(
+        self,
+        original_lines: list[str],
+        lines: list[str],
+        contexts: Iterable[tuple[str | None, str | None]] | None = None,
+    ) -> list[str]:
+        """Check the lines of a file rule by rule, rather than line by line.
+
+        Each line-local rule (see :class:`BufferRule`) runs once over the
+        whole file, and its matches are dispatched to the lines by offset.
+        The other rules run line by line, on the lines containing one of their
+        triggers. Each line goes through the same rules in the same order as
+        in :meth:`check_line`, so the results are the same, and the errors are
+        sorted back by line.
+
+        Returns
+        -------
+        The corrected lines.
+        """
+        lines = list(lines)
+        nlines = len(lines)
+        first_error = len(self.errors)
+        skipped: set[int] = set()
+        heads: dict[int, str] = {}
+        if contexts is not None:
+            for i, (head, region) in zip(range(nlines), contexts, strict=False):
+                if region is not None:
+                    skipped.add(i)
+                    self.kept.add(i + 1)
+                elif head is not None:
+                    heads[i] = head
+        if self.line_filter is not None:
+            filtered = [i for i in range(nlines) if i + 1 not in self.line_filter]
+            skipped.update(filtered)
+            self.kept.update(i + 1 for i in filtered)
+        # Lines checked one at a time, within the line timeout, after the others
+        timed: set[int] = set()
+        if self.line_timeout > 0:
+            timed.update(
+                i
+                for i, line in enumerate(lines)
+                if len(line) > TIMED_LINE_LENGTH and i not in skipped
+            )
+        excluded = skipped | timed
+
+        # Lines not ending with a single newline: one is appended to them in
+        # the buffer, and those with several are checked line by line
+        unterminated: set[int] = set()
+        multiline: set[int] = set()
+        non_ascii: set[int] = set()
+
+        def track(i: int, line: str) -> None:
+            unterminated.discard(i)
+            multiline.discard(i)
+            end = line.find("\n")
+            if end < 0:
+                unterminated.add(i)
+            elif end != len(line) - 1:
+                multiline.add(i)
+            if line.isascii():
+                non_ascii.discard(i)
+            else:
+                non_ascii.add(i)
+
+        for i, line in enumerate(lines):
+            if line.find("\n") != len(line) - 1 or not line.isascii():
+                track(i, line)
+
+        buffer = lowered = ""
+        is_ascii = True
+        starts: list[int] = []
+        stale = True
+
+        def lines_with(triggers: tuple[str, ...], limit: int) -> set[int] | None:
+            # The lines containing a trigger, None if more than `limit`
+            if len(lowered) != len(buffer):
+                # Lowering changed the offsets of some non-ASCII characters
+                return None
+            found = set(non_ascii)
+            for trigger in triggers:
+                pos = lowered.find(trigger)
+                while pos >= 0:
+                    i = bisect_right(starts, pos) - 1
+                    found.add(i)
+                    if len(found) > limit:
+                        return None
+                    pos = lowered.find(trigger, starts[i + 1])
+            return found
+
+        def matches_of(
+            pattern: re.Pattern, triggers: tuple[str, ...] | None
+        ) -> dict[int, list[re.Match] | None]:
+            # The matches of a line-local rule, by line. When few lines contain
+            # its triggers, only those are searched.
+            found = None
+            if triggers is not None and self.prefilter:
+                found = lines_with(triggers, nlines // 4)
+            if found is None:
+                spans = [(0, len(buffer))]
+            else:
+                spans = [(starts[i], starts[i + 1]) for i in sorted(found)]
+            by_line: dict[int, list[re.Match] | None] = {}
+            for start, end in spans:
+                for res in pattern.finditer(buffer, start, end):
+                    i = bisect_right(starts, res.start()) - 1
+                    matches = by_line.get(i)
+                    if matches is None:
+                        by_line[i] = [res]
+                    else:
+                        matches.append(res)
+            return by_line
+
+        for entry in self.rules.buffer_rules:
+            self._deadline.check()
+            if stale:
+                parts = lines
+                if unterminated or timed:
+                    parts = lines.copy()
+                    for i in unterminated:
+                        parts[i] += "\n"
+                    for i in timed:
+                        parts[i] = "\n"
+                buffer = "".join(parts)
+                is_ascii = buffer.isascii()
+                lowered = buffer.lower()
+                # Offset of the start of each line in the buffer
+                starts = list(accumulate(map(len, parts), initial=0))
+                stale = False
+            self._line_tokens = {}
+
+            todo: dict[int, list[re.Match] | None]
+            pattern, ascii_pattern, triggers = entry.members[0]
+            if is_ascii:
+                pattern = ascii_pattern
+            if isinstance(entry.rule, tuple) and pattern is not None:
+                # The matches of a line-local rule are applied directly
+                todo = matches_of(pattern, triggers)
+                todo.update(dict.fromkeys(multiline))
+            else:
+                # A rule of a group only runs if the previous ones did not
+                # match, so on the line as it was before the group
+                found = non_ascii | multiline
+                for pattern, ascii_pattern, triggers in entry.members:
+                    if is_ascii:
+                        pattern = ascii_pattern
+                    lines_found: Iterable[int] | None = None
+                    if pattern is not None:
+                        lines_found = matches_of(pattern, triggers).keys()
+                    elif triggers is not None and self.prefilter:
+                        lines_found = lines_with(triggers, nlines)
+                    if lines_found is None:
+                        found.update(range(nlines))
+                        break
+                    found.update(lines_found)
+                todo = dict.fromkeys(sorted(found))
+
+            for i, matches in todo.items():
+                if i in excluded:
+                    continue
+                line = lines[i]
+                rule = entry.rule
+                if matches is not None and isinstance(rule, tuple):
+                    new_line, _ = self.apply_matches(
+                        line,
+                        original_line=original_lines[i],
+                        lineno=i + 1,
+                        rule=rule,
+                        matches=matches,
+                        offset=starts[i],
+                    )
+                else:
+                    self._head = heads.get(i)
+                    # The lines have already been filtered by the triggers
+                    self._candidates_line, self._candidates = line, None
+                    new_line, _ = self.check_ruleset(
+                        line,
+                        original_line=original_lines[i],
+                        lineno=i + 1,
+                        ruleset=rule,
+                        depth=1,
+                    )
+                if new_line != line:
+                    lines[i] = new_line
+                    track(i, new_line)
+                    stale = True
+
+        for i in sorted(timed):
+            lines[i] = self.check_line(i + 1, original_lines[i], lines[i], heads.get(i))
+        if len(self.errors) > first_error:
+            self.errors[first_error:] = sorted(
+                self.errors[first_error:], key=attrgetter("line")
+            )
+        for i in skipped:
+            lines[i] = original_lines[i]
+        return lines
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether :attr:`max_errors` errors have been found."""
+        return 0 < self.max_errors <= self.errcount
+
+    def fix_until_stable(self, max_passes: int) -> bool:
+        """Apply the corrections again, until the lines reach a fixed point.
+
+        Some corrections enable others, or change the indentation. Each pass
+        re-indents the corrected lines (as they would be written) and only
+        re-checks the lines whose content or indentation has changed in the
+        previous pass. The errors are those of the first pass.
+
+        Parameters
+        ----------
+        max_passes : int
+            Maximum number of passes, including the initial check.
+
+        Returns
+        -------
+        Whether the lines have converged, also stored in :attr:`converged`.
+        """
+        errors, errcount = self.errors, self.errcount
+        inputs, indented, contexts = self.original_lines, self.lines, self._contexts
+        outputs = _as_written(self.corrected_lines)
+        while outputs != inputs:
+            if self.passes >= max_passes:
+                self.converged = False
+                # Reported by the callers, see `converged`
+                logger.debug(
+                    "Corrections of %s did not converge after %d passes",
+                    self.filename,
+                    self.passes,
+                )
+                break
+            self.passes += 1
+
+            tstart = time.perf_counter()
+            new_indented, new_contexts = self.indent(outputs)
+            tcheck = time.perf_counter()
+            aligned = len(outputs) == len(inputs)
+            corrected_lines = []
+            for i, (line, indented_line, context) in enumerate(
+                zip(outputs, new_indented, new_contexts, strict=True)
+            ):
+                if (
+                    aligned
+                    and line == inputs[i]
+                    and indented_line == indented[i]
+                    and context == contexts[i]
+                ):
+                    # Same input as in the previous pass, so same output
+                    corrected_lines.append(self.corrected_lines[i])
+                else:
+                    corrected_lines.append(
+                        self.check_line(i + 1, line, indented_line, *context)
+                    )
+            self.timings["indent"] += tcheck - tstart
+            self.timings["check"] += time.perf_counter() - tcheck
+
+            self.corrected_lines = corrected_lines
+            inputs, indented, contexts = outputs, new_indented, new_contexts
+            outputs = _as_written(corrected_lines)
+
+        self.lines, self._contexts = indented, contexts
+        self.errors, self.errcount = errors, errcount
+        return self.converged
+
+    def check_line(
+        self,
+        lineno: int,
+        original_line: str,
+        line: str,
+        head: str | None = None,
+        region: str | None = None,
+    ) -> str:
+        """Check an indented line, returning its corrected version.
+
+        ``head`` is the code of the first line of the statement continued by
+        the line, if any (see :attr:`LineInfo.head`): the groups of rules
+        skipping that line also skip its continuation lines. Lines in a
+        ``region`` to skip are kept unchanged, without checking them.
+        """
+        if self.line_filter is not None and lineno not in self.line_filter:
+            self.kept.add(lineno)
+            return original_line
+        if region is not None:
+            if self.stats is not None:
+                self.stats[f"<{region} region>"].skipped += 1
+            self.kept.add(lineno)
+            return original_line
+        self._deadline.check()
+        # Versions of the line lexed while checking it, see `tokenize`
+        self._line_tokens = {}
+        self._head = head
+        if self.line_timeout > 0 and len(line) > TIMED_LINE_LENGTH:
+            return self.check_timed_line(lineno, original_line, line)
+
+        line, _ = self.check_ruleset(
+            line, original_line=original_line, lineno=lineno, ruleset=self.rules.get()
+        )
+        return line
+
+    def check_timed_line(self, lineno: int, original_line: str, line: str) -> str:
+        """Check a line within :attr:`line_timeout`, or keep it unchanged."""
+        nerrors, errcount, modifcount = len(self.errors), self.errcount, self.modifcount
+        try:
+            with Deadline(self.line_timeout) as deadline:
+                corrected, _ = self.check_ruleset(
+                    line,
+                    original_line=original_line,
+                    lineno=lineno,
+                    ruleset=self.rules.get(),
+                )
+        except DeadlineError as e:
+            if e.deadline is not deadline:
+                raise
+        else:
+            return corrected
+
+        # Forget what was done on the line, which may have been interrupted
+        # anywhere
+        del self.errors[nerrors:]
+        self.errcount, self.modifcount = errcount, modifcount
+        self._line_tokens = {}
+        self._candidates_line = None
+        logger.debug(
+            "Gave up checking line %d of %s after %g s",
+            lineno,
+            self.filename,
+            self.line_timeout,
+        )
+        self.timed_out = True
+        self.kept.add(lineno)
+        if self.stats is not None:
+            self.stats["<timed out>"].skipped += 1
+        if not self.exhausted:
+            self.errors.append(
+                Diagnostic(
+                    self.filename,
+                    lineno,
+                    1,
+                    "T001",
+                    f"Line not checked: took more than {self.line_timeout:g} s",
+                    None,
+                    original_line,
+                )
             )
-            self.corrected_lines.append(line)
+            self.errcount += 1
+        return original_line
+
+    def give_up(self) -> None:
+        """Keep the whole file unchanged, once its check has taken more than
+        :attr:`file_timeout`."""
+        logger.debug("Gave up checking %s after %g s", self.filename, self.file_timeout)
+        self.timed_out = True
+        self.corrected_lines = [] if self.check_only else list(self.original_lines)
+        lines = self.original_lines
+        self.kept = set(range(1, len(lines) + 1))
+        self.errors = [
+            self.timeout_error(1, lines[0] if lines else "", "File not checked")
+        ]
+        self.errcount = 1
+        self.modifcount = 0
+        self.passes, self.converged = 1, True
+
+    def timeout_error(
+        self, lineno: int, original_line: str, message: str
+    ) -> Diagnostic:
+        return Diagnostic(
+            self.filename,
+            lineno,
+            1,
+            "T002",
+            f"{message}: took more than {self.file_timeout:g} s",
+            None,
+            original_line,
+        )
+
+    def iter_check(
+        self, lines: Iterable[str]
+    ) -> Iterator[tuple[str, list[Diagnostic]]]:
+        """Indent and check lines one at a time.
+
+        Parameters
+        ----------
+        lines : iterable of str
+            The lines of the file, e.g. an open file object.
+
+        Yields
+        ------
+        The corrected line and the errors found on it. Neither is accumulated
+        in :attr:`corrected_lines` nor :attr:`errors`, so that memory usage does
+        not depend on the size of the file: likewise, :attr:`kept` only holds
+        the number of the line just yielded, if it is kept unchanged. With
+        :attr:`check_only`, it stops once the errors are :attr:`exhausted`.
+        """
+        self.indenter.reset()
+        timings = self.timings
+        timings["indent"] = timings["check"] = 0.0
+        # The indenter consumes the lines in lockstep with the checker
+        original_lines, to_indent = tee(lines)
+        indented_lines = self.indenter.indent_lines(to_indent)
+        for lineno, original_line in enumerate(original_lines, start=1):
+            self.kept.clear()
+            tstart = time.perf_counter()
+            line = next(indented_lines)
+            context = self.context(self.indenter.info)
+            tcheck = time.perf_counter()
+            corrected = self.check_line(lineno, original_line, line, *context)
+            tend = time.perf_counter()
+            timings["indent"] += tcheck - tstart
+            timings["check"] += tend - tcheck
+
+            errors, self.errors = self.errors, []
+            if 0 < self.file_timeout < timings["check"]:
+                # The lines already written cannot be taken back
+                logger.debug("Gave up checking %s after line %d", self.filename, lineno)
+                self.timed_out = True
+                errors.append(
+                    self.timeout_error(
+                        lineno, original_line, f"File not checked after line {lineno}"
+                    )
+                )
+                self.errcount += 1
+                yield corrected, errors
+                if not self.check_only:
+                    for next_lineno, original_line in enumerate(
+                        original_lines, start=lineno + 1
+                    ):
+                        self.kept = {next_lineno}
+                        yield original_line, []
+                return
+            yield corrected, errors
+            if self.check_only and self.exhausted:
+                return
+
+    def result(self) -> CheckResult:
+        return CheckResult(
+            self.filename,
+            self.errors,
+            self.errcount,
+            self.modifcount,
+            self.corrected_lines,
+            self.converged,
+            tuple(sorted(self.kept)),
+        )
 
     def check_ruleset(
         self,
         line: str,
         *,
         original_line: str,
-        meta: dict,
+        lineno: int,
         ruleset: RULE_T | list[RULE_T],
         depth: int = 0,
     ) -> tuple[str, int]:
         if isinstance(ruleset, tuple):
             return self.check_rule(
-                line, original_line=original_line, meta=meta, rule=ruleset
+                line, original_line=original_line, lineno=lineno, rule=ruleset
             )
 
+        if depth >= 1 and self.skips_statement(ruleset):
+            return line, 0
+
         for rule in ruleset:
             line, hints = self.check_ruleset(
                 line,
                 original_line=original_line,
-                meta=meta,
+                lineno=lineno,
                 ruleset=rule,
                 depth=depth + 1,
             )
@@ -526,53 +1850,137 @@ class LineChecker:
 
         return line, hints
 
+    def skips_statement(self, group: Iterable[RULE_T]) -> bool:
+        """Whether a skip rule of a group (without correction nor message)
+        matches the head of the statement of the current line."""
+        head = self._head
+        if head is None:
+            return False
+        return any(
+            isinstance(rule, tuple)
+            and rule[1] is None
+            and rule[2] is None
+            and rule[0].search(head) is not None
+            for rule in group
+        )
+
+    def tokenize(self, line: str) -> LineTokens:
+        """Lex a line, reusing the result until the line is modified."""
+        tokens = self._line_tokens.get(line)
+        if tokens is None:
+            tokens = self._line_tokens[line] = LineTokens(line)
+        return tokens
+
+    def may_match(self, regexp: re.Pattern, line: str) -> bool:
+        if not self.prefilter:
+            return True
+        # Only rescan when the line has been modified by a previous rule
+        if line != self._candidates_line:
+            self._candidates_line = line
+            self._candidates = self.rules.candidates(line)
+        return self._candidates is None or regexp in self._candidates
+
     def check_rule(
-        self, line: str, *, original_line: str, meta: dict, rule: BASERULE_T
+        self, line: str, *, original_line: str, lineno: int, rule: BASERULE_T
     ) -> tuple[str, int]:
+        regexp = rule[0]
+        counter = None if self.stats is None else self.stats[self.rules.names[rule]]
+        if not self.may_match(regexp, line):
+            if counter is not None:
+                counter.skipped += 1
+            return line, 0
+        if counter is None:
+            matches = list(regexp.finditer(line))
+        else:
+            tstart = time.perf_counter()
+            matches = list(regexp.finditer(line))
+            counter.time += time.perf_counter() - tstart
+            counter.lines += 1
+        return self.apply_matches(
+            line,
+            original_line=original_line,
+            lineno=lineno,
+            rule=rule,
+            matches=matches,
+            counter=counter,
+        )
+
+    def apply_matches(
+        self,
+        line: str,
+        *,
+        original_line: str,
+        lineno: int,
+        rule: BASERULE_T,
+        matches: list[re.Match],
+        offset: int = 0,
+        counter: RuleCounter | None = None,
+    ) -> tuple[str, int]:
+        """Apply the corrections of the matches of a rule in a line.
+
+        The matches may have been found in a larger text, in which the line
+        starts at ``offset``.
+        """
         regexp, correction, msg = rule
-        original_strings = [m[0] for m in re_strings.finditer(original_line)]
+        original_strings = self.tokenize(original_line).strings
         comment_start = line.find("!")
-        errs = 0
         hints = 0
         new_line = line
-        for res in reversed(list(regexp.finditer(line))):
+        for res in reversed(matches):
             corrected = new_line
-            if 0 <= comment_start < res.start():
+            start, end = res.start() - offset, res.end() - offset
+            if 0 <= comment_start < start:
                 # do not modify a comment
                 # except if comment_start == res.start()
                 # (adding space after first !)
                 continue
-            meta["pos"] = res.start() + 1
+            if counter is not None:
+                counter.matches += 1
             hints += 1
             if callable(correction):
                 self.modifcount += 1
                 corrected = correction(line, res)
             elif correction is not None:
                 self.modifcount += 1
-                part = corrected[res.start() : res.end()]
-                fix = regexp.sub(correction, part)
-                corrected = corrected[: res.start()] + fix + corrected[res.end() :]
+                fix = regexp.sub(correction, corrected[start:end])
+                tokens = self.tokenize(corrected)
+                if (
+                    "'" in fix
+                    or '"' in fix
+                    or "\n" in fix
+                    or tokens.touches_literal(start, end)
+                ):
+                    corrected = corrected[:start] + fix + corrected[end:]
+                else:
+                    # Quotes and newlines are left as they are, outside of
+                    # strings: the strings are unchanged, no need to lex again
+                    tokens = tokens.replace(start, end, fix)
+                    corrected = tokens.line
+                    self._line_tokens.setdefault(corrected, tokens)
 
             # Now check we haven't modified any string
-            new_strings = [m[0] for m in re_strings.finditer(corrected)]
-            if new_strings != original_strings:
+            if self.tokenize(corrected).strings != original_strings:
+                if counter is not None:
+                    counter.rejected += 1
                 continue
+            if counter is not None and corrected != new_line:
+                counter.applied += 1
 
-            meta["pos"] = res.start() + 1
             hints += 1
             self.modifcount += 1
-            meta["correction"] = new_line = corrected
-            if msg is not None:
-                self.fmt_err(msg, meta)
-                errs += 1
+            new_line = corrected
+            if msg is not None and not self.exhausted:
+                self.errors.append(
+                    Diagnostic(
+                        self.filename,
+                        lineno,
+                        start + 1,
+                        self.rules.ids[rule],
+                        msg,
+                        None if correction is None else corrected,
+                        original_line,
+                    )
+                )
                 self.errcount += 1
 
         return new_line, hints
-
-    def fmt_err(self, msg: str, meta: dict) -> None:
-        showpos = " " * (meta["pos"]) + "1"
-        self.errors.append(
-            f"{meta['filename']}:{meta['line']}:{meta['pos']}:\n\n"
-            f" {meta['original_line']}\n {showpos}\n"
-            f"Warning: {msg} at (1)."
-        )
@@ -0,0 +1,181 @@
+"""Rendering of diagnostics.
+
+Diagnostics are recorded as :class:`~.main.Diagnostic` records while checking;
+they are only turned into text here, when they are printed.
+"""
+
+import json
+from collections.abc import Iterable
+from importlib.metadata import PackageNotFoundError, version
+from typing import IO
+
+from .main import Diagnostic
+
+FORMATS = ("text", "gcc", "json", "sarif")
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+INFORMATION_URI = "https://github.com/cphyc/fortran-linter"
+
+
+def format_text(diagnostic: Diagnostic) -> str:
+    """Render a diagnostic like gfortran, showing the line and the position."""
+    showpos = " " * diagnostic.column + "1"
+    original_line = diagnostic.original_line.replace("\n", "")
+    return (
+        f"{diagnostic.filename}:{diagnostic.line}:{diagnostic.column}:\n\n"
+        f" {original_line}\n {showpos}\n"
+        f"Warning: {diagnostic.message} at (1)."
+    )
+
+
+def format_gcc(diagnostic: Diagnostic) -> str:
+    """Render a diagnostic on a single line, as ``file:line:col: warning: msg``."""
+    return (
+        f"{diagnostic.filename}:{diagnostic.line}:{diagnostic.column}: "
+        f"warning: {diagnostic.message} [{diagnostic.rule}]"
+    )
+
+
+def to_dict(diagnostic: Diagnostic) -> dict:
+    return {
+        "filename": diagnostic.filename,
+        "line": diagnostic.line,
+        "column": diagnostic.column,
+        "rule": diagnostic.rule,
+        "message": diagnostic.message,
+        "fix": None if diagnostic.fix is None else diagnostic.fix.rstrip("\n"),
+    }
+
+
+def to_sarif(diagnostics: Iterable[Diagnostic]) -> dict:
+    """Return a SARIF 2.1.0 log of the diagnostics.
+
+    The corrections of a line are given as a single fix, replacing the whole
+    line, on its first result with a correction: the fixes of the results on
+    the same line would otherwise overlap.
+    """
+    diagnostics = list(diagnostics)
+    # The version of each line after all its corrections, and their messages
+    fixed_lines: dict[tuple[str, int], str] = {}
+    fix_messages: dict[tuple[str, int], list[str]] = {}
+    for diagnostic in diagnostics:
+        if diagnostic.fix is not None:
+            key = diagnostic.filename, diagnostic.line
+            fixed_lines[key] = diagnostic.fix
+            fix_messages.setdefault(key, []).append(diagnostic.message)
+
+    # Index and description of each rule, in order of appearance
+    rules: dict[str, tuple[int, str]] = {}
+    results = []
+    for diagnostic in diagnostics:
+        rule_index, _ = rules.setdefault(
+            diagnostic.rule, (len(rules), diagnostic.message)
+        )
+        location = {
+            "physicalLocation": {
+                "artifactLocation": {"uri": diagnostic.filename},
+                "region": {
+                    "startLine": diagnostic.line,
+                    "startColumn": diagnostic.column,
+                },
+            }
+        }
+        result: dict = {
+            "ruleId": diagnostic.rule,
+            "ruleIndex": rule_index,
+            "level": "warning",
+            "message": {"text": diagnostic.message},
+            "locations": [location],
+        }
+        key = diagnostic.filename, diagnostic.line
+        if diagnostic.fix is not None and key in fixed_lines:
+            # Replace the whole line by its corrected version
+            corrected_line = fixed_lines.pop(key)
+            original_line = diagnostic.original_line.rstrip("\n")
+            result["fixes"] = [
+                {
+                    "description": {"text": "; ".join(fix_messages[key])},
+                    "artifactChanges": [
+                        {
+                            "artifactLocation": {"uri": diagnostic.filename},
+                            "replacements": [
+                                {
+                                    "deletedRegion": {
+                                        "startLine": diagnostic.line,
+                                        "startColumn": 1,
+                                        "endColumn": len(original_line) + 1,
+                                    },
+                                    "insertedContent": {
+                                        "text": corrected_line.rstrip("\n")
+                                    },
+                                }
+                            ],
+                        }
+                    ],
+                }
+            ]
+        results.append(result)
+
+    try:
+        tool_version = version("fortran_linter")
+    except PackageNotFoundError:
+        tool_version = "unknown"
+    return {
+        "$schema": SARIF_SCHEMA,
+        "version": "2.1.0",
+        "runs": [
+            {
+                "tool": {
+                    "driver": {
+                        "name": "fortran-linter",
+                        "version": tool_version,
+                        "informationUri": INFORMATION_URI,
+                        "rules": [
+                            {"id": rule, "shortDescription": {"text": message}}
+                            for rule, (_, message) in rules.items()
+                        ],
+                    }
+                },
+                "results": results,
+            }
+        ],
+    }
+
+
+class Reporter:
+    """Print diagnostics in one of the :data:`FORMATS`.
+
+    The line-based formats are printed as the files are reported, the
+    document-based ones (JSON, SARIF) once all the files have been reported.
+    """
+
+    fmt: str
+    stream: IO[str]
+    pending: list[Diagnostic]
+
+    def __init__(self, fmt: str, stream: IO[str]):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+        self.fmt = fmt
+        self.stream = stream
+        self.pending = []
+
+    def report(self, diagnostics: list[Diagnostic]) -> None:
+        """Report the diagnostics of a file."""
+        if self.fmt == "text":
+            # An empty line for clean files
+            print("\n".join(map(format_text, diagnostics)), file=self.stream)
+        elif self.fmt == "gcc":
+            for diagnostic in diagnostics:
+                print(format_gcc(diagnostic), file=self.stream)
+        else:
+            self.pending.extend(diagnostics)
+
+    def close(self) -> None:
+        # Encoded at once, and not indented, which is much faster for large
+        # documents (the C encoder is only used without indentation)
+        if self.fmt == "json":
+            print(json.dumps([to_dict(d) for d in self.pending]), file=self.stream)
+        elif self.fmt == "sarif":
+            print(json.dumps(to_sarif(self.pending)), file=self.stream)
+        self.pending = []
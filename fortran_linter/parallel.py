@@ -0,0 +1,41 @@
+"""Ordered execution of checks in a pool of workers."""
+
+from collections import deque
+from collections.abc import Callable, Generator, Iterable
+from concurrent.futures import Executor, Future
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+def run_in_order(
+    executor: Executor, calls: Iterable[Callable[[], T]], window: int
+) -> Generator[T, None, None]:
+    """Run calls in a pool, yielding their results in the order of ``calls``.
+
+    At most ``window`` calls are in flight: ``calls`` is consumed as the
+    results are yielded, so that the whole input is neither queued nor held in
+    memory. When the caller stops early (or on error), the calls that have not
+    started yet are cancelled.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        The pool to run the calls in.
+    calls : iterable of callables
+        The calls to run, without arguments (e.g. :func:`functools.partial`
+        objects, which can be sent to worker processes).
+    window : int
+        Maximum number of calls in flight.
+    """
+    pending: deque[Future[T]] = deque()
+    try:
+        for call in calls:
+            pending.append(executor.submit(call))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
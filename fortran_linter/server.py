@@ -0,0 +1,246 @@
+"""Long-running lint server, for editor integrations.
+
+The server reads JSON-RPC 2.0 requests from stdin, one per line, and writes
+one response per line to stdout. The rules are compiled once, so that each
+request only pays for checking the buffer. Methods:
+
+``lint``
+    Parameters: ``text`` (the content of the buffer), and optionally
+    ``filename``, ``linelength``, ``indent_size``, ``max_errors``, ``select``,
+    ``ignore`` and ``document``. As with the CLI, ``select`` and ``ignore``
+    (lists of rule IDs or prefixes) default to those of the ``pyproject.toml``
+    given with ``--config``, or else of the closest one to ``filename`` (see
+    :mod:`.config`). Result: ``{"diagnostics": [{"line", "column", "rule",
+    "message"}, ...], "corrected": str, "errcount": int, "modifcount": int,
+    "checked": [start, end]}``. When a ``document`` identifier is given, the
+    server keeps the state of the buffer and only re-checks the lines affected
+    by the changes since the previous request (``checked`` is the 0-based
+    range of lines that have been checked).
+``close``
+    Parameters: ``document``. Forget the state of a document.
+``shutdown``
+    Stop the server.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from collections.abc import Callable, Sequence
+from typing import IO, Any
+
+from .config import KEYS, ConfigError, ConfigReadError, find_config, load_config
+from .incremental import IncrementalLinter
+from .main import get_rules
+
+logger = logging.getLogger(__name__)
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RPCError(Exception):
+    code: int
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class LintServer:
+    linelen: int
+    indent_size: int
+    config: str | None
+    running: bool
+    methods: dict[str, Callable[[dict], Any]]
+    documents: dict[Any, tuple[tuple, IncrementalLinter]]
+
+    def __init__(
+        self, linelen: int = 120, indent_size: int = 4, config: str | None = None
+    ):
+        self.linelen = linelen
+        self.indent_size = indent_size
+        self.config = config
+        self.running = True
+        self.methods = {
+            "lint": self.lint,
+            "close": self.close,
+            "shutdown": self.shutdown,
+        }
+        self.documents = {}
+        # Warm up the rules for the default configuration
+        get_rules(linelen)
+
+    def lint(self, params: dict) -> dict:
+        try:
+            text = params["text"]
+        except KeyError:
+            raise RPCError(INVALID_PARAMS, "Missing parameter 'text'") from None
+        if not isinstance(text, str):
+            raise RPCError(INVALID_PARAMS, "Parameter 'text' should be a string")
+        linelen = params.get("linelength", self.linelen)
+        indent_size = params.get("indent_size", self.indent_size)
+        max_errors = params.get("max_errors", -1)
+        filename = params.get("filename", "<stdin>")
+        document = params.get("document")
+        select, ignore = self.rule_codes(params, filename)
+        try:
+            rules = get_rules(linelen, select, ignore)
+        except ValueError as e:
+            raise RPCError(INVALID_PARAMS, str(e)) from None
+
+        config = (filename, linelen, indent_size, select, ignore)
+        known = self.documents.get(document) if document is not None else None
+        if known is not None and known[0] == config:
+            linter = known[1]
+            checked = linter.set_text(text)
+        else:
+            linter = IncrementalLinter(
+                text,
+                filename=filename,
+                linelen=linelen,
+                indent_size=indent_size,
+                rules=rules,
+            )
+            checked = (0, len(linter.lines))
+        if document is not None:
+            self.documents[document] = (config, linter)
+
+        diagnostics = linter.diagnostics()
+        if max_errors > 0:
+            diagnostics = diagnostics[:max_errors]
+        return {
+            "diagnostics": diagnostics,
+            "corrected": linter.corrected_text(),
+            "errcount": linter.errcount,
+            "modifcount": linter.modifcount,
+            "checked": checked,
+        }
+
+    def rule_codes(
+        self, params: dict, filename: str
+    ) -> tuple[frozenset[str] | None, frozenset[str]]:
+        """Return the rules to select and to ignore for a request, as the CLI
+        does: the parameters override the configuration file."""
+        codes: dict[str, frozenset[str] | None] = {}
+        for key in KEYS:
+            if key not in params:
+                continue
+            value = params[key]
+            if not isinstance(value, list) or not all(
+                isinstance(v, str) for v in value
+            ):
+                raise RPCError(
+                    INVALID_PARAMS, f"Parameter {key!r} should be a list of rule IDs"
+                )
+            codes[key] = frozenset(value)
+        if len(codes) < len(KEYS):
+            # Read at each request, to follow the edits of the file
+            path = self.config or find_config(
+                os.path.dirname(os.path.abspath(filename))
+            )
+            try:
+                config = load_config(path) if path else {}
+            except ConfigReadError as e:
+                # Only an explicit --config has to be readable
+                if self.config is not None:
+                    raise RPCError(INVALID_PARAMS, str(e)) from None
+                config = {}
+            except ConfigError as e:
+                raise RPCError(INVALID_PARAMS, str(e)) from None
+            for key in KEYS:
+                codes.setdefault(key, config.get(key))
+        return codes["select"], codes["ignore"] or frozenset()
+
+    def close(self, params: dict) -> None:
+        document = params.get("document")
+        if document is not None:
+            self.documents.pop(document, None)
+
+    def shutdown(self, params: dict) -> None:
+        self.running = False
+
+    def handle(self, request: Any) -> dict | None:
+        """Handle a request, returning the response (None for notifications)."""
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return self._error(None, INVALID_REQUEST, "Invalid request")
+
+        req_id = request.get("id")
+        method = self.methods.get(request["method"])
+        try:
+            if method is None:
+                raise RPCError(METHOD_NOT_FOUND, f"Unknown method {request['method']}")
+            params = request.get("params") or {}
+            if not isinstance(params, dict):
+                raise RPCError(INVALID_PARAMS, "Parameters should be an object")
+            result = method(params)
+        except RPCError as e:
+            return self._error(req_id, e.code, str(e))
+        except Exception as e:
+            logger.exception("Error while handling %s", request["method"])
+            return self._error(req_id, INTERNAL_ERROR, str(e))
+
+        if "id" not in request:
+            return None
+        return {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+    @staticmethod
+    def _error(req_id: Any, code: int, message: str) -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "id": req_id,
+            "error": {"code": code, "message": message},
+        }
+
+    def serve(self, fin: IO[str], fout: IO[str]) -> None:
+        for raw in fin:
+            if not raw.strip():
+                continue
+            response: dict | None
+            try:
+                request = json.loads(raw)
+            except ValueError:
+                response = self._error(None, PARSE_ERROR, "Parse error")
+            else:
+                response = self.handle(request)
+            if response is not None:
+                fout.write(json.dumps(response) + "\n")
+                fout.flush()
+            if not self.running:
+                break
+
+
+def main(input_args: Sequence | None = None):
+    parser = argparse.ArgumentParser(
+        description="Serve linting requests (JSON-RPC over stdio)."
+    )
+    parser.add_argument(
+        "--linelength", type=int, default=120, help="Line length. Default %(default)s."
+    )
+    parser.add_argument(
+        "--indent-size",
+        type=int,
+        default=4,
+        help="Indentation size. Default %(default)s.",
+    )
+    parser.add_argument(
+        "--config",
+        help=(
+            "pyproject.toml file to read the [tool.fortran-linter] table from. "
+            "Default: the closest one to the file of each request."
+        ),
+    )
+    args = parser.parse_args(input_args)
+
+    server = LintServer(
+        linelen=args.linelength, indent_size=args.indent_size, config=args.config
+    )
+    server.serve(sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
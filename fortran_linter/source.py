@@ -0,0 +1,118 @@
+"""Reading of source files.
+
+Files are memory-mapped rather than read into a buffer. Pure-ASCII files, by
+far the most common, are decoded straight from the mapping; the others are
+decoded with the configured encoding. Bytes that do not decode (e.g. a Latin-1
+comment in a UTF-8 file) are kept as lone surrogates (``surrogateescape``), so
+that they do not stop the check and are written back unchanged.
+
+Newlines are translated as when opening the file in text mode, unless
+``newline=""`` is given to keep them as they are, e.g. to write some lines
+back unchanged.
+"""
+
+import codecs
+import io
+import mmap
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+
+DEFAULT_ENCODING = "utf-8"
+# Error handler for the bytes that do not decode, also used when writing
+ERRORS = "surrogateescape"
+
+# Characters other than "\n" that end lines, in text mode or for
+# `str.splitlines`
+_SEPARATORS = "\r\x0b\x0c\x1c\x1d\x1e"
+# Size of the chunks decoded at once by `iter_lines`
+CHUNK_SIZE = 1 << 20
+
+# Encodings in which the newline bytes only ever encode newlines, so that
+# lines can be split before decoding them
+_SPLITTABLE = {"ascii", "utf-8", "iso8859-1", "iso8859-15", "cp1252"}
+
+
+@contextmanager
+def mapped(path: str) -> Iterator[bytes | mmap.mmap]:
+    """Map a file in memory, read-only.
+
+    Empty files, and files that cannot be mapped (e.g. pipes), are read
+    instead.
+    """
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            yield f.read()
+            return
+        with data:
+            yield data
+
+
+def decode(
+    data: bytes | memoryview | mmap.mmap, encoding: str = DEFAULT_ENCODING
+) -> str:
+    """Decode the content of a file, trying ASCII first."""
+    try:
+        return str(data, "ascii")
+    except UnicodeDecodeError:
+        return str(data, encoding, ERRORS)
+
+
+def split_lines(text: str, newline: str | None = None) -> list[str]:
+    """Split decoded text into lines, translating the newlines as text mode.
+
+    With ``newline=""``, the lines are split at the same places, but their
+    newlines are kept untranslated.
+    """
+    if text.isascii() and not any(c in text for c in _SEPARATORS):
+        return text.splitlines(keepends=True)
+    return io.StringIO(text, newline=newline).readlines()
+
+
+def translate_newline(line: str) -> str:
+    """Translate the newline of an untranslated line, as text mode."""
+    if line.endswith("\r\n"):
+        return line[:-2] + "\n"
+    if line.endswith("\r"):
+        return line[:-1] + "\n"
+    return line
+
+
+def read_lines(
+    path: str, encoding: str = DEFAULT_ENCODING, newline: str | None = None
+) -> list[str]:
+    """Read the lines of a file, as ``open(path, newline=newline).readlines()``."""
+    with mapped(path) as data:
+        text = decode(data, encoding)
+    return split_lines(text, newline)
+
+
+def iter_lines(
+    path: str, encoding: str = DEFAULT_ENCODING, newline: str | None = None
+) -> Generator[str, None, None]:
+    """Iterate over the lines of a file, decoding them a chunk at a time.
+
+    The chunks end with a newline, and are decoded directly from the mapping.
+    Files in an encoding where a newline byte may be part of another
+    character (e.g. UTF-16) are decoded at once.
+    """
+    with mapped(path) as data:
+        if codecs.lookup(encoding).name not in _SPLITTABLE:
+            yield from split_lines(decode(data, encoding), newline)
+            return
+        view = memoryview(data)
+        try:
+            start, size = 0, len(data)
+            while start < size:
+                end = size
+                if start + CHUNK_SIZE < size:
+                    # Cut after the last newline of the chunk (or the first
+                    # one after it, for very long lines)
+                    end = data.rfind(b"\n", start, start + CHUNK_SIZE) + 1
+                    if end == 0:
+                        end = data.find(b"\n", start + CHUNK_SIZE) + 1 or size
+                yield from split_lines(decode(view[start:end], encoding), newline)
+                start = end
+        finally:
+            view.release()
@@ -0,0 +1,124 @@
+"""Time limits, to give up on the lines and files that take too long to check.
+
+A :class:`Deadline` is enforced with a ``SIGALRM`` timer where possible (on
+Unix, in the main thread, when no other timer is running). :mod:`re` checks for
+signals while matching, so this interrupts even a single slow match. Elsewhere,
+the code only stops at its next call to :meth:`Deadline.check`, and the block
+fails when it ends too late.
+"""
+
+import math
+import signal
+import threading
+import time
+from collections.abc import Callable
+from types import FrameType, TracebackType
+from typing import Any
+
+
+class DeadlineError(Exception):
+    """Raised in a block of code once its :class:`Deadline` has passed."""
+
+    def __init__(self, deadline: "Deadline"):
+        super().__init__(f"Took more than {deadline.seconds:g} s")
+        self.deadline = deadline
+
+
+# The deadlines entered, innermost last
+_active: list["Deadline"] = []
+# The handler of SIGALRM while deadlines are not active
+_previous_handler: Callable[[int, FrameType | None], Any] | int | None = None
+
+
+def _can_interrupt() -> bool:
+    return (
+        hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+        and signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+    )
+
+
+def _on_alarm(signum: int, frame: FrameType | None) -> None:
+    if not _active:
+        # Delivered after the end of the block
+        return
+    deadline = min(_active, key=lambda d: d.expires)
+    remaining = deadline.expires - time.monotonic()
+    if remaining > 0:
+        signal.setitimer(signal.ITIMER_REAL, remaining)
+        return
+    raise DeadlineError(deadline)
+
+
+def _arm() -> None:
+    expires = min((d.expires for d in _active if d.interrupts), default=math.inf)
+    if expires < math.inf:
+        signal.setitimer(signal.ITIMER_REAL, max(expires - time.monotonic(), 1e-6))
+
+
+class Deadline:
+    """Limit the time spent in a block of code.
+
+    ::
+
+        try:
+            with Deadline(5) as deadline:
+                ...
+        except DeadlineError as e:
+            if e.deadline is not deadline:
+                raise  # the deadline of an enclosing block
+            ...
+
+    Deadlines can be nested. A limit of 0 or less means no limit.
+    """
+
+    seconds: float
+    expires: float
+    interrupts: bool
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = math.inf
+        self.interrupts = False
+
+    def __enter__(self) -> "Deadline":
+        global _previous_handler
+        if self.seconds <= 0:
+            return self
+        self.expires = time.monotonic() + self.seconds
+        if any(d.interrupts for d in _active):
+            self.interrupts = True
+        elif _can_interrupt():
+            self.interrupts = True
+            _previous_handler = signal.signal(signal.SIGALRM, _on_alarm)
+        _active.append(self)
+        if self.interrupts:
+            _arm()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self.seconds <= 0:
+            return
+        _active.remove(self)
+        if self.interrupts:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            if any(d.interrupts for d in _active):
+                _arm()
+            else:
+                signal.signal(signal.SIGALRM, _previous_handler or signal.SIG_DFL)
+        if exc is None:
+            self.check()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def check(self) -> None:
+        """Raise :class:`DeadlineError` if the deadline has passed."""
+        if self.expired:
+            raise DeadlineError(self)
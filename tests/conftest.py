@@ -0,0 +1,21 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).parent
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    """Keep the results cached by the CLI out of the user's cache."""
+    path = tmp_path / "xdg-cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    return path
+
+
+@pytest.fixture
+def source(tmp_path):
+    dst = tmp_path / "test.f90"
+    shutil.copy2(HERE / "test.f90", dst)
+    return dst
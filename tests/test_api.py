@@ -0,0 +1,65 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from fortran_linter import LintConfig, LineChecker, api, lint_many, lint_text
+
+HERE = Path(__file__).parent
+TEST_FILE = HERE / "test.f90"
+
+
+def test_lint_text_matches_checker():
+    result = lint_text(TEST_FILE.read_text(), filename=str(TEST_FILE))
+    assert result == LineChecker(str(TEST_FILE)).result()
+
+
+def test_lint_text_config():
+    text = "subroutine foo()\ninteger::a\nend subroutine foo\n"
+    result = lint_text(text, LintConfig(indent_size=2, check_only=True))
+    assert result.corrected_lines == []
+    assert {error.filename for error in result.errors} == {"<text>"}
+    assert lint_text(text, LintConfig(indent_size=2)).corrected_lines[1] == (
+        "  integer :: a\n"
+    )
+
+
+def test_lint_text_newlines():
+    assert lint_text("a = 1\r\nb = 2\r\n") == lint_text("a = 1\nb = 2\n")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_lint_many(jobs):
+    items = [(f"file{i}.f90", f"a={i}\n") for i in range(10)]
+    results = list(lint_many(iter(items), jobs=jobs))
+    assert [res.filename for res in results] == [name for name, _ in items]
+    assert results == [lint_text(text, filename=name) for name, text in items]
+
+
+def test_lint_many_executor():
+    items = [(f"file{i}.f90", "integer::a\n") for i in range(5)]
+    config = LintConfig(linelen=10)
+    with ThreadPoolExecutor(2) as executor:
+        results = list(lint_many(items, config, jobs=2, executor=executor))
+        # The pool is left open for other batches
+        assert len(list(lint_many(items, config, executor=executor))) == 5
+    assert results == [lint_text(text, config, name) for name, text in items]
+
+
+def test_lint_many_stops_early(monkeypatch):
+    linted = []
+
+    def slow_lint_text(text, config, filename):
+        time.sleep(0.01)
+        linted.append(filename)
+        return lint_text(text, config, filename)
+
+    monkeypatch.setattr(api, "lint_text", slow_lint_text)
+    items = [(f"file{i}.f90", "a=1\n") for i in range(10)]
+    with ThreadPoolExecutor(1) as executor:
+        results = lint_many(items, jobs=2, executor=executor)
+        assert next(results).filename == "file0.f90"
+        # The files queued in the pool are not checked anymore
+        results.close()
+    assert len(linted) < 8
@@ -0,0 +1,86 @@
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from fortran_linter import cache
+from fortran_linter.cache import ResultCache
+from fortran_linter.cli import main
+from fortran_linter.main import LineChecker
+
+
+def test_roundtrip(tmp_path, source):
+    cache = ResultCache(str(tmp_path / "cache"))
+    content = source.read_bytes()
+    key = cache.key(str(source), content, 120, 4)
+    assert cache.get(key) is None
+
+    result = LineChecker(str(source)).result()
+    cache.put(key, result)
+    assert cache.get(key) == result
+
+
+def test_key_depends_on_config(tmp_path, source):
+    cache = ResultCache(str(tmp_path / "cache"))
+    content = source.read_bytes()
+    key = cache.key(str(source), content, 120, 4)
+    assert key == cache.key(str(source), content, 120, 4)
+    assert key != cache.key(str(source), content, 80, 4)
+    assert key != cache.key(str(source), content, 120, 2)
+    assert key != cache.key(str(source), content + b"\n", 120, 4)
+
+
+def test_prune(tmp_path, source):
+    cache = ResultCache(str(tmp_path / "cache"), max_size=0)
+    result = LineChecker(str(source)).result()
+    for i in range(3):
+        cache.put(cache.key(str(source), bytes(i), 120, 4), result)
+    assert len(list((tmp_path / "cache").rglob("*.json"))) == 3
+
+    cache.prune()
+    assert len(list((tmp_path / "cache").rglob("*.json"))) == 0
+
+
+def test_cli_replays_results(tmp_path, source, capsys):
+    cache_dir = tmp_path / "cache"
+    outputs = []
+    for _ in range(2):
+        with pytest.raises(SystemExit):
+            main([str(source), "--syntax-only", "--cache-dir", str(cache_dir)])
+        outputs.append(capsys.readouterr().out)
+
+    assert len(list(cache_dir.rglob("*.json"))) == 1
+    assert outputs[0] == outputs[1]
+
+
+def test_cli_no_cache(tmp_path, source):
+    cache_dir = tmp_path / "cache"
+    with pytest.raises(SystemExit):
+        main(
+            [str(source), "--syntax-only", "--no-cache", "--cache-dir", str(cache_dir)]
+        )
+    assert not cache_dir.exists()
+
+
+def test_code_version_covers_the_package(tmp_path):
+    package = tmp_path / "fortran_linter"
+    shutil.copytree(Path(cache.__file__).parent, package)
+    script = "from fortran_linter.cache import _code_version; print(_code_version())"
+
+    def code_version():
+        return subprocess.run(  # noqa: S603
+            [sys.executable, "-c", script],
+            cwd=tmp_path,
+            env=dict(os.environ, PYTHONPATH=str(tmp_path)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    before = code_version()
+    with open(package / "source.py", "a") as f:
+        f.write("\n# changed\n")
+    assert code_version() != before
@@ -0,0 +1,227 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from fortran_linter import cli
+from fortran_linter.cli import _iter_results, main, parse_arguments
+from fortran_linter.main import LineChecker, RuleStats
+
+HERE = Path(__file__).parent
+
+
+def test_import_has_no_side_effect(tmp_path):
+    env = dict(os.environ, PYTHONPATH=str(HERE.parent))
+    subprocess.run(
+        [sys.executable, "-c", "import fortran_linter.main"],
+        cwd=tmp_path,
+        env=env,
+        check=True,
+    )
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_logging_is_opt_in():
+    env = dict(os.environ, PYTHONPATH=str(HERE.parent))
+    code = "import fortran_linter.main as m; m.logger.warning('Not printed')"
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert proc.stderr == ""
+
+
+def test_log_file(tmp_path, source):
+    log_file = tmp_path / "linter.log"
+    with pytest.raises(SystemExit):
+        main([str(source), "--syntax-only", "--no-cache", "--log-file", str(log_file)])
+    assert f"Checked {source}" in log_file.read_text()
+
+
+def test_profile(source, capsys):
+    with pytest.raises(SystemExit):
+        main([str(source), "--syntax-only", "--no-cache", "--profile"])
+    err = capsys.readouterr().err
+    for phase in ("read", "indent", "check", "write", "wall"):
+        assert phase in err
+
+
+def test_stats(source, capsys):
+    with pytest.raises(SystemExit):
+        main([str(source), "--syntax-only", "--stats", "json"])
+    single = json.loads(capsys.readouterr().err)
+    counter = single["Replace .eq. with =="]
+    assert set(counter) == {
+        "time",
+        "lines",
+        "skipped",
+        "matches",
+        "applied",
+        "rejected",
+    }
+    assert single["Missing space before operator"]["applied"] > 0
+
+    # Statistics are aggregated over files and workers
+    copy = source.with_name("copy.f90")
+    shutil.copy2(source, copy)
+    with pytest.raises(SystemExit):
+        main([str(source), str(copy), "--syntax-only", "--stats=json", "-j", "2"])
+    double = json.loads(capsys.readouterr().err)
+    for name, counter in single.items():
+        assert double[name]["matches"] == 2 * counter["matches"]
+        assert double[name]["lines"] == 2 * counter["lines"]
+
+
+@pytest.mark.parametrize("mode", ["--syntax-only", "--stdout"])
+def test_stream_matches_batch(source, capsys, mode):
+    outputs = []
+    for extra in ([], ["--stream"]):
+        with pytest.raises(SystemExit):
+            main([str(source), mode, "--no-cache", *extra])
+        outputs.append(capsys.readouterr().out)
+    assert outputs[0] == outputs[1]
+
+
+def test_stream_inplace(source):
+    copy = source.with_name("copy.f90")
+    shutil.copy2(source, copy)
+    with pytest.raises(SystemExit):
+        main([str(source), "-i", "--no-cache"])
+    with pytest.raises(SystemExit):
+        main([str(copy), "-i", "--stream"])
+    assert source.read_text() == copy.read_text()
+    assert copy.with_name("copy.f90.orig").exists()
+
+
+def test_fix_until_stable(tmp_path, capsys):
+    source = tmp_path / "a.f90"
+    source.write_text("if (c.eq.'s') then\nx = 1;;\nendif\n")
+    with pytest.raises(SystemExit):
+        main([str(source), "-i", "--no-cache", "--fix-until-stable"])
+    assert source.read_text() == "if (c == 's') then\n    x = 1\nend if\n"
+    assert capsys.readouterr().err == ""
+
+    # A single pass is not enough
+    source.write_text("if (c.eq.'s') then\nx = 1;;\nendif\n")
+    with pytest.raises(SystemExit):
+        main([str(source), "-i", "--no-cache"])
+    once = source.read_text()
+    assert once == "if (c =='s') then\n    x = 1;\nend if\n"
+
+    # Reported once, in a fresh process where the logging is not set up
+    source.write_text("if (c.eq.'s') then\nx = 1;;\nendif\n")
+    args = [str(source), "-i", "--no-cache", "--fix-until-stable", "--max-passes=2"]
+    env = dict(os.environ, PYTHONPATH=str(HERE.parent))
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-m", "fortran_linter.cli", *args],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.stderr.count("did not converge") == 1
+
+
+def test_fix_until_stable_rechecks_changed_lines(tmp_path):
+    source = tmp_path / "a.f90"
+    source.write_text("flag = c.eq.'s'\n" + "a = 1\n" * 100)
+    stats = RuleStats()
+    lc = LineChecker(str(source), max_passes=10, stats=stats)
+    assert lc.converged
+    assert lc.passes == 3
+    assert lc.corrected_lines[0] == "flag = c == 's'\n"
+    # Only the first pass errors are reported
+    assert {err.line for err in lc.errors} == {1}
+    # The unchanged lines are only checked in the first pass
+    assert stats["Line length > 120 characters"].lines == 101 + 2
+
+
+def test_skip_regions(tmp_path, capsys):
+    source = tmp_path / "a.f90"
+    source.write_text("#if 0\na=1\n#endif\n")
+    with pytest.raises(SystemExit) as exc:
+        main([str(source), "--syntax-only", "--no-cache"])
+    assert exc.value.code == 1
+    capsys.readouterr()
+
+    main([str(source), "--syntax-only", "--skip-regions", "preprocessor"])
+    main([str(source), "--syntax-only", "--stats=json", "--skip-regions=preprocessor"])
+    stats = json.loads(capsys.readouterr().err)
+    assert stats["<preprocessor region>"]["skipped"] == 3
+
+    with pytest.raises(SystemExit):
+        main([str(source), "--skip-regions", "markers,foo"])
+    assert "unknown region(s) foo" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("extra", [[], ["--stream"]])
+def test_skipped_regions_are_written_as_they_are(tmp_path, extra):
+    source = tmp_path / "a.f90"
+    content = b"x=1  \r\n! fortran-linter: off\r\ny=2   \r\n! fortran-linter: on\r\n"
+    # The markers are part of the region
+    expected = f"x = 1{os.linesep}".encode() + content[len(b"x=1  \r\n") :]
+    # The second time from the cache, which keeps the lines to leave unchanged
+    for _ in range(2):
+        source.write_bytes(content)
+        with pytest.raises(SystemExit):
+            main([str(source), "-i", "--no-backup", *extra])
+        assert source.read_bytes() == expected
+
+
+@pytest.mark.parametrize("extra", [[], ["-j", "2"], ["--stream"]])
+def test_max_total_errors(tmp_path, capsys, extra):
+    for i in range(20):
+        shutil.copy2(HERE / "test.f90", tmp_path / f"test{i:02d}.f90")
+    args = [str(tmp_path), "--syntax-only", "--no-cache", "--format=gcc", *extra]
+    with pytest.raises(SystemExit):
+        main([*args, "--max-errors", "3"])
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == 3 * 20
+
+    with pytest.raises(SystemExit):
+        main([*args, "--max-total-errors", "7", "--max-errors", "3"])
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == out[:7]
+    assert "Stopped after 7 errors" in captured.err
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_files_get_the_remaining_budget(tmp_path, jobs):
+    files = [str(tmp_path / f"test{i:02d}.f90") for i in range(20)]
+    for ifile in files:
+        shutil.copy2(HERE / "test.f90", ifile)
+    args = parse_arguments(
+        [str(tmp_path), "--syntax-only", "--max-total-errors", "7", "-j", jobs]
+    )
+    args.result_cache = None
+    results = [res for res, _, _ in _iter_results(files, args)]
+    assert len(results[0].errors) == 7
+    # The files are not submitted anymore once the budget is used up
+    if jobs == "1":
+        assert len(results) == 1
+    else:
+        assert len(results) < len(files)
+
+
+def test_no_more_workers_than_files(tmp_path, monkeypatch):
+    files = [str(tmp_path / f"test{i}.f90") for i in range(2)]
+    for ifile in files:
+        shutil.copy2(HERE / "test.f90", ifile)
+    pools = []
+
+    class Pool(cli.ProcessPoolExecutor):
+        def __init__(self, max_workers, **kwargs):
+            pools.append(max_workers)
+            super().__init__(max_workers, **kwargs)
+
+    monkeypatch.setattr(cli, "ProcessPoolExecutor", Pool)
+    args = parse_arguments([*files, "--syntax-only", "--no-cache", "-j", "8"])
+    args.result_cache = None
+    assert len(list(_iter_results(files, args))) == 2
+    assert pools == [2]
@@ -1,4 +1,9 @@
-from fortran_linter.main import comment_location, string_locations
+from fortran_linter.main import (
+    LineTokens,
+    comment_location,
+    in_string,
+    string_locations,
+)
 
 
 def test_string_detection():
@@ -57,3 +62,38 @@ def test_fortran_comment_detection():
 
     for line in no_comment_lines:
         assert comment_location(line) == len(line)
+
+
+def test_in_string():
+    line = "print*, 'foo', 'bar' ! 'baz'"
+    spans = list(string_locations(line))
+    assert not in_string(line, (0, 5), spans)
+    assert in_string(line, (9, 10), spans)
+    assert in_string(line, (16, 18), spans)
+    assert not in_string(line, (13, 16), spans)
+    assert not in_string(line, (21, 22), spans)
+    assert not in_string(line, (0, 1), [])
+
+
+def test_line_tokens():
+    tokens = LineTokens("a = 'b!c' ! comment")
+    assert tokens.string_spans == [(4, 9)]
+    assert tokens.comment_start == 10
+    assert tokens.code == "a = 'b!c' "
+    assert tokens.strings == ["'b!c'"]
+    assert tokens.in_string((6, 7))
+
+
+def test_line_tokens_replace():
+    tokens = LineTokens("a=b // 'x=y' // c=d")
+    assert tokens.literals == [(7, 12)]
+    assert tokens.touches_literal(9, 10)
+    assert tokens.touches_literal(5, 8)
+    assert not tokens.touches_literal(0, 3)
+
+    replaced = tokens.replace(1, 2, " = ")
+    assert replaced.line == "a = b // 'x=y' // c=d"
+    assert replaced.literals == [(9, 14)]
+    assert replaced.strings == LineTokens(replaced.line).strings
+    # The other tokens are lexed on demand
+    assert replaced.string_spans == [(9, 14)]
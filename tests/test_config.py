@@ -0,0 +1,87 @@
+import pytest
+
+from fortran_linter.cli import main
+from fortran_linter.config import (
+    ConfigError,
+    ConfigReadError,
+    find_config,
+    load_config,
+)
+
+
+def test_find_config(tmp_path):
+    (tmp_path / "pyproject.toml").write_text("")
+    subdir = tmp_path / "src" / "mod"
+    subdir.mkdir(parents=True)
+    assert find_config(str(subdir)) == str(tmp_path / "pyproject.toml")
+
+
+def test_load_config(tmp_path):
+    path = tmp_path / "pyproject.toml"
+    path.write_text(
+        '[tool.other]\nselect = 1\n[tool.fortran-linter]\nignore = ["M1"]\n'
+    )
+    assert load_config(str(path)) == {"ignore": frozenset({"M1"})}
+
+    for content in (
+        "[tool.fortran-linter]\nignore = 'M1'\n",
+        "[tool.fortran-linter]\nlinelength = 80\n",
+        "[tool.fortran-linter\n",
+        "[tool]\nfortran-linter = 1\n",
+    ):
+        path.write_text(content)
+        with pytest.raises(ConfigError):
+            load_config(str(path))
+
+    path.write_text("[tool.fortran-linter\n")
+    with pytest.raises(ConfigReadError):
+        load_config(str(path))
+
+
+def test_cli_config(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "a.f90"
+    source.write_text("if (a.eq.b) a = 1\n")
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit):
+        main([str(source), "--syntax-only", "--no-cache", "--format=gcc"])
+    assert "[M101]" in capsys.readouterr().out
+
+    (tmp_path / "pyproject.toml").write_text(
+        '[tool.fortran-linter]\nignore = ["M", "S"]\n'
+    )
+    main([str(source), "--syntax-only", "--no-cache", "--format=gcc"])
+    assert capsys.readouterr().out == ""
+
+    # The command line overrides the configuration
+    with pytest.raises(SystemExit):
+        main([str(source), "--syntax-only", "--no-cache", "--ignore=S"])
+    assert "Replace .eq. with ==" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exc:
+        main([str(source), "--select", "Z"])
+    assert exc.value.code == 2
+    assert "Unknown rule 'Z'" in capsys.readouterr().err
+
+
+def test_cli_unreadable_config(tmp_path, monkeypatch, capsys):
+    source = tmp_path / "a.f90"
+    source.write_text("a = 1\n")
+    config = tmp_path / "pyproject.toml"
+    config.write_text("[project\n")
+    subdir = tmp_path / "src"
+    subdir.mkdir()
+    monkeypatch.chdir(subdir)
+    # e.g. the pyproject.toml of an enclosing project
+    main([str(source), "--syntax-only"])
+    assert f"Could not read {config}" in capsys.readouterr().err
+
+    with pytest.raises(SystemExit) as exc:
+        main([str(source), "--syntax-only", "--config", str(config)])
+    assert exc.value.code == 2
+    assert "Could not read" in capsys.readouterr().err
+
+    # The table of the linter has to be valid
+    config.write_text("[tool.fortran-linter]\nignore = 'M1'\n")
+    with pytest.raises(SystemExit) as exc:
+        main([str(source), "--syntax-only"])
+    assert exc.value.code == 2
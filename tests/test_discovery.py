@@ -0,0 +1,113 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from fortran_linter.cli import main
+from fortran_linter.discovery import GitIgnore, iter_files
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name in (
+        "a.f90",
+        "b.F90",
+        "notes.txt",
+        "src/c.f90",
+        "src/d.f03",
+        "src/build/e.f90",
+        "src/vendor/f.f90",
+        "src/vendor/keep.f90",
+        "src/deep/er/g.f95",
+    ):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("a = 1\n")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("build/\n")
+    (tmp_path / "src" / "vendor" / ".gitignore").write_text("*.f90\n!keep.f90\n")
+    return tmp_path
+
+
+def relative(paths, root: Path) -> list[str]:
+    return [Path(p).relative_to(root).as_posix() for p in paths]
+
+
+def test_top_level(tree):
+    assert relative(iter_files([str(tree)]), tree) == ["a.f90"]
+
+
+def test_recursive(tree):
+    files = relative(iter_files([str(tree)], recursive=True), tree)
+    assert files == [
+        "a.f90",
+        "src/c.f90",
+        "src/deep/er/g.f95",
+        "src/vendor/keep.f90",
+    ]
+
+
+def test_extensions_and_exclude(tree):
+    files = iter_files(
+        [str(tree)],
+        recursive=True,
+        extensions=(".F90", ".f03", ".f90"),
+        exclude=["deep", "src/c.*"],
+        gitignore=False,
+    )
+    assert relative(files, tree) == [
+        "a.f90",
+        "b.F90",
+        "src/d.f03",
+        "src/build/e.f90",
+        "src/vendor/f.f90",
+        "src/vendor/keep.f90",
+    ]
+
+
+def test_parent_gitignore(tree):
+    # The .gitignore files of the parent directories apply
+    files = iter_files([str(tree / "src")], recursive=True, extensions=(".f90",))
+    assert relative(files, tree) == ["src/c.f90", "src/vendor/keep.f90"]
+
+
+def test_files_are_yielded_lazily(tree):
+    files = iter_files([str(tree / "a.f90"), str(tree / "missing")], recursive=True)
+    assert next(files) == str(tree / "a.f90")
+    # Files are passed through, even if they do not exist
+    assert next(files) == str(tree / "missing")
+
+
+@pytest.mark.parametrize(
+    ("pattern", "path", "is_dir", "expected"),
+    [
+        ("*.o", "x/y.o", False, True),
+        ("/top.f90", "top.f90", False, True),
+        ("/top.f90", "x/top.f90", False, None),
+        ("a/**/b", "a/x/y/b", False, True),
+        ("a/**/b", "a/b", False, True),
+        ("logs/", "logs", False, None),
+        ("logs/", "x/logs", True, True),
+        ("[ab].f90", "b.f90", False, True),
+        ("[!ab].f90", "b.f90", False, None),
+    ],
+)
+def test_gitignore_patterns(pattern, path, is_dir, expected):
+    ignore = GitIgnore("/root", [pattern])
+    assert ignore.match(os.path.join("/root", path), is_dir) is expected
+
+
+def test_cli_recursive(tree, capsys):
+    main([str(tree), "-r", "--stdout", "--no-cache", "-v", "-j", "2"])
+    out = capsys.readouterr().out
+    checked = [
+        line.removeprefix("Checking ")
+        for line in out.splitlines()
+        if line.startswith("Checking ")
+    ]
+    assert relative(checked, tree) == [
+        "a.f90",
+        "src/c.f90",
+        "src/deep/er/g.f95",
+        "src/vendor/keep.f90",
+    ]
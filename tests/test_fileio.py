@@ -0,0 +1,72 @@
+import os
+import shutil
+import stat
+from pathlib import Path
+
+import pytest
+
+from fortran_linter.cli import main
+from fortran_linter.fileio import atomic_write, write_if_changed
+
+HERE = Path(__file__).parent
+
+
+@pytest.fixture
+def clean_file(tmp_path):
+    path = tmp_path / "a.f90"
+    path.write_text("a = 1\n")
+    os.utime(path, (0, 0))
+    return path
+
+
+@pytest.mark.parametrize(
+    "write",
+    [write_if_changed, lambda path, content, **kw: atomic_write(path, [content], **kw)],
+)
+def test_unchanged_is_not_written(clean_file, write):
+    assert not write(str(clean_file), "a = 1\n")
+    assert clean_file.stat().st_mtime == 0
+    assert sorted(p.name for p in clean_file.parent.iterdir()) == ["a.f90"]
+
+
+def test_changed_is_written(clean_file):
+    clean_file.chmod(0o640)
+    assert write_if_changed(str(clean_file), "a = 2\n")
+    assert clean_file.read_text() == "a = 2\n"
+    assert stat.S_IMODE(clean_file.stat().st_mode) == 0o640
+    backup = clean_file.with_name("a.f90.orig")
+    assert backup.read_text() == "a = 1\n"
+    assert backup.stat().st_mtime == 0
+
+    # An existing backup is replaced
+    assert write_if_changed(str(clean_file), "a = 3\n")
+    assert backup.read_text() == "a = 2\n"
+
+
+def test_no_backup(clean_file):
+    assert write_if_changed(str(clean_file), "a = 2\n", backup=False)
+    assert sorted(p.name for p in clean_file.parent.iterdir()) == ["a.f90"]
+
+
+def test_failed_write_keeps_original(clean_file):
+    def chunks():
+        yield "a = 2\n"
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        atomic_write(str(clean_file), chunks())
+    assert clean_file.read_text() == "a = 1\n"
+    assert sorted(p.name for p in clean_file.parent.iterdir()) == ["a.f90"]
+
+
+@pytest.mark.parametrize("extra", [[], ["--stream"], ["-j", "2"]])
+def test_cli_skips_clean_files(tmp_path, extra):
+    shutil.copy2(HERE / "test_reference.f90", tmp_path / "clean.f90")
+    shutil.copy2(HERE / "test.f90", tmp_path / "dirty.f90")
+    clean = tmp_path / "clean.f90"
+    os.utime(clean, (0, 0))
+    with pytest.raises(SystemExit):
+        main([str(tmp_path), "-i", "--no-cache", "--no-backup", *extra])
+    assert clean.stat().st_mtime == 0
+    assert (tmp_path / "dirty.f90").read_text() == clean.read_text()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["clean.f90", "dirty.f90"]
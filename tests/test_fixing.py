@@ -81,5 +81,31 @@ class TestAutoFixing:
         with pytest.raises(FileNotFoundError):
             main([not_a_file, "--stdout"])
 
+    def test_parallel_matches_serial(self, capsys):
+        for i in range(3):
+            shutil.copy2(self.test_file, Path(self.WDIR) / f"test_{i}.f90")
+
+        outputs = []
+        for jobs in ("1", "3"):
+            with pytest.raises(SystemExit):
+                main([self.WDIR, "--syntax-only", "-j", jobs])
+            outputs.append(capsys.readouterr().out)
+
+        assert outputs[0] == outputs[1]
+        assert outputs[0].count("test_1.f90") > 0
+
+    def test_parallel_inplace(self):
+        copy = Path(self.WDIR) / "test_copy.f90"
+        shutil.copy2(self.test_file, copy)
+        with pytest.raises(SystemExit):
+            main([str(self.test_file), str(copy), "-i", "-j", "2"])
+
+        expected = self.reference_file.read_text()
+        assert self.test_file.read_text() == copy.read_text()
+        for lexp, lobt in zip_longest(
+            expected.splitlines(), copy.read_text().splitlines()
+        ):
+            assert lexp == lobt
+
     def tearDown(self):
         pass
@@ -0,0 +1,132 @@
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from fortran_linter.cli import main
+from fortran_linter.gitdiff import GitDiffError, LineRanges, changed_lines, parse_diff
+from fortran_linter.main import LineChecker
+
+HERE = Path(__file__).parent
+
+DIFF = """\
+diff --git a.f90 a.f90
+index 0000000..1111111 100644
+--- a.f90
++++ a.f90
+@@ -3 +3 @@ program a
+-a=1
++a = 1
+@@ -10,0 +11,2 @@ end
++++ x
++b=2
+@@ -20,2 +21,0 @@
+-c=3
+-d=4
+diff --git b.f90 b.f90
+deleted file mode 100644
+--- b.f90
++++ /dev/null
+@@ -1 +0,0 @@
+-a=1
+diff --git c.f90 c.f90
+--- c.f90
++++ c.f90
+@@ -1,2 +0,0 @@
+-a=1
+-b=1
+"""
+
+
+def test_parse_diff():
+    changes = parse_diff(DIFF)
+    assert list(changes) == ["a.f90"]
+    ranges = changes["a.f90"]
+    assert [i for i in range(30) if i in ranges] == [3, 11, 12]
+
+
+def test_line_ranges_merge():
+    ranges = LineRanges([(5, 8), (1, 3), (3, 4), (7, 10), (20, 20)])
+    assert (ranges.starts, ranges.stops) == ([1, 5], [4, 10])
+    assert 4 not in ranges
+    assert 9 in ranges
+    assert not LineRanges()
+
+
+def test_line_filter():
+    fname = str(HERE / "test.f90")
+    full = LineChecker(fname)
+    selected = range(10, 40)
+    partial = LineChecker(fname, line_filter=selected)
+    assert partial.errcount > 0
+    assert partial.errors == [err for err in full.errors if err.line in selected]
+    for lineno, (original, corrected) in enumerate(
+        zip(full.original_lines, partial.corrected_lines, strict=True), start=1
+    ):
+        if lineno in selected:
+            assert corrected == full.corrected_lines[lineno - 1]
+        else:
+            assert corrected == original
+
+
+def git(*args, cwd):
+    config = ["-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.run(  # noqa: S603
+        ["git", *config, *args],  # noqa: S607
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    if shutil.which("git") is None:
+        pytest.skip("git is not available")
+    git("init", "-q", cwd=tmp_path)
+    (tmp_path / "changed.f90").write_text("a=1\nb=2\nc=3\n")
+    (tmp_path / "unchanged.f90").write_text("a=1\n")
+    git("add", ".", cwd=tmp_path)
+    git("commit", "-q", "-m", "initial", cwd=tmp_path)
+    (tmp_path / "changed.f90").write_text("a=1\nb = 2\nc=4\n")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_changed_lines(repo):
+    changes = changed_lines("HEAD")
+    assert list(changes) == [str((repo / "changed.f90").resolve())]
+    with pytest.raises(GitDiffError):
+        changed_lines("not-a-revision")
+    with pytest.raises(GitDiffError):
+        changed_lines("--output=foo")
+
+
+def test_cli_diff_base(repo, capsys):
+    with pytest.raises(SystemExit):
+        main([".", "--syntax-only", "--diff-base", "HEAD", "-v"])
+    out = capsys.readouterr().out
+    assert "unchanged.f90" not in out
+    # Only the third line has an error, the first one is not checked
+    assert "changed.f90:3:" in out
+    assert "changed.f90:1:" not in out
+
+    with pytest.raises(SystemExit) as excinfo:
+        main([".", "--syntax-only", "--diff-base", "not-a-revision"])
+    assert excinfo.value.code == 2
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_cli_diff_base_keeps_other_lines(repo, stream):
+    path = repo / "kept.f90"
+    path.write_bytes(b"x=1   \r\ny=2\r\n")
+    git("add", ".", cwd=repo)
+    git("commit", "-q", "-m", "kept", cwd=repo)
+    path.write_bytes(b"x=1   \r\ny=3\r\n")
+    args = [str(path), "-i", "--no-backup", "--diff-base", "HEAD"]
+    with pytest.raises(SystemExit):
+        main([*args, "--stream"] if stream else args)
+    # Only the changed line is corrected, the other one is written back as is
+    assert path.read_bytes() == f"x=1   \r\ny = 3{os.linesep}".encode()
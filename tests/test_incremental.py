@@ -0,0 +1,81 @@
+import random
+from pathlib import Path
+
+from fortran_linter.incremental import IncrementalLinter
+from fortran_linter.main import LineChecker
+
+HERE = Path(__file__).parent
+TEST_FILE = HERE / "test.f90"
+
+
+def assert_same(linter: IncrementalLinter, text: str) -> None:
+    reference = IncrementalLinter(text, checkpoint_interval=1000)
+    assert linter.corrected_lines == reference.corrected_lines
+    assert linter.diagnostics() == reference.diagnostics()
+    assert linter.modifcount == reference.modifcount
+
+
+def test_matches_checker():
+    linter = IncrementalLinter(TEST_FILE.read_text(), filename=str(TEST_FILE))
+    lc = LineChecker(str(TEST_FILE))
+    assert linter.corrected_lines == lc.corrected_lines
+    assert linter.errcount == lc.errcount
+    assert linter.modifcount == lc.modifcount
+
+
+def test_random_edits():
+    rng = random.Random(0)  # noqa: S311
+    lines = TEST_FILE.read_text().splitlines(keepends=True)
+    snippets = [
+        "do i=1,10\n",
+        "end do\n",
+        "if (a) then\n",
+        "endif\n",
+        "a = b + &\n",
+        "print*,'foo!'\n",
+        "\n",
+    ]
+    linter = IncrementalLinter("".join(lines), checkpoint_interval=8)
+    for _ in range(50):
+        start = rng.randrange(len(lines) + 1)
+        end = min(len(lines), start + rng.randrange(3))
+        new = rng.sample(snippets, rng.randrange(3))
+        lines[start:end] = new
+        linter.update(start, end, new)
+        assert linter.lines == lines
+    assert_same(linter, "".join(lines))
+
+
+def test_local_edit_stops_early():
+    body = "".join(
+        f"subroutine foo{i}()\n    integer :: a\n    a = {i}\nend subroutine foo{i}\n"
+        for i in range(500)
+    )
+    linter = IncrementalLinter(body, checkpoint_interval=16)
+    nlines = len(linter.lines)
+
+    new_body = body.replace("a = 250\n", "a=250\n")
+    start, stop = linter.set_text(new_body)
+    assert stop - start <= 16
+    assert_same(linter, new_body)
+
+    # Changing the structure is propagated until the state converges
+    new_body = new_body.replace("a=250\n", "do i = 1, 2\n", 1)
+    start, stop = linter.set_text(new_body)
+    assert stop == nlines
+    assert_same(linter, new_body)
+
+
+def test_lines_split_as_in_files():
+    # Form feeds and other separators do not end lines in Fortran files
+    text = "a=1\x0c b=2\nc=3\r\nd=4\x1c\x85 \n"
+    lc = LineChecker("f.f90", text=text)
+    linter = IncrementalLinter(text, filename="f.f90")
+    assert linter.corrected_lines == lc.corrected_lines
+    assert [d["line"] for d in linter.diagnostics()] == [e.line for e in lc.errors]
+
+    edited = text.replace("c=3", "c = 3")
+    linter.set_text(edited)
+    lc = LineChecker("f.f90", text=edited)
+    assert linter.corrected_lines == lc.corrected_lines
+    assert [d["line"] for d in linter.diagnostics()] == [e.line for e in lc.errors]
@@ -0,0 +1,96 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from fortran_linter.cli import main
+from fortran_linter.main import Diagnostic, LineChecker
+from fortran_linter.output import FORMATS, Reporter, format_gcc, format_text
+
+HERE = Path(__file__).parent
+TEST_FILE = HERE / "test.f90"
+
+DIAGNOSTIC = Diagnostic(
+    "foo.f90", 3, 4, "spaces", "Missing space", "  a = 1\n", "  a=1\n"
+)
+
+
+def test_format_text():
+    assert format_text(DIAGNOSTIC) == (
+        "foo.f90:3:4:\n\n   a=1\n     1\nWarning: Missing space at (1)."
+    )
+
+
+def test_format_gcc():
+    assert format_gcc(DIAGNOSTIC) == "foo.f90:3:4: warning: Missing space [spaces]"
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_reporter_empty(fmt):
+    out = io.StringIO()
+    reporter = Reporter(fmt, out)
+    reporter.report([])
+    reporter.close()
+    if fmt == "json":
+        assert json.loads(out.getvalue()) == []
+    elif fmt == "sarif":
+        assert json.loads(out.getvalue())["runs"][0]["results"] == []
+
+
+def test_sarif():
+    out = io.StringIO()
+    reporter = Reporter("sarif", out)
+    reporter.report([DIAGNOSTIC, DIAGNOSTIC._replace(fix=None, rule="other")])
+    reporter.close()
+    (run,) = json.loads(out.getvalue())["runs"]
+    assert [rule["id"] for rule in run["tool"]["driver"]["rules"]] == [
+        "spaces",
+        "other",
+    ]
+    assert run["tool"]["driver"]["rules"][0]["shortDescription"] == {
+        "text": "Missing space"
+    }
+    first, second = run["results"]
+    assert first["ruleIndex"] == 0
+    assert first["locations"][0]["physicalLocation"]["region"] == {
+        "startLine": 3,
+        "startColumn": 4,
+    }
+    (fix,) = first["fixes"]
+    (replacement,) = fix["artifactChanges"][0]["replacements"]
+    assert replacement["insertedContent"]["text"] == "  a = 1"
+    assert "fixes" not in second
+
+
+def test_sarif_one_fix_per_line():
+    out = io.StringIO()
+    reporter = Reporter("sarif", out)
+    other = DIAGNOSTIC._replace(rule="other", message="Other", fix="  a = 1 \n")
+    reporter.report([DIAGNOSTIC, other, DIAGNOSTIC._replace(line=4)])
+    reporter.close()
+    (run,) = json.loads(out.getvalue())["runs"]
+    first, second, third = run["results"]
+    # A single fix for all the corrections of the line, which would conflict
+    (fix,) = first["fixes"]
+    assert fix["description"] == {"text": "Missing space; Other"}
+    (replacement,) = fix["artifactChanges"][0]["replacements"]
+    assert replacement["insertedContent"]["text"] == "  a = 1 "
+    assert "fixes" not in second
+    (fix,) = third["fixes"]
+    (replacement,) = fix["artifactChanges"][0]["replacements"]
+    assert replacement["deletedRegion"]["startLine"] == 4
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_cli_json(capsys, stream):
+    with pytest.raises(SystemExit):
+        main(
+            [str(TEST_FILE), "--syntax-only", "--format", "json", "--no-cache"]
+            + (["--stream"] if stream else [])
+        )
+    data = json.loads(capsys.readouterr().out)
+    lc = LineChecker(str(TEST_FILE))
+    assert [(d["line"], d["column"], d["message"]) for d in data] == [
+        (d.line, d.column, d.message) for d in lc.errors
+    ]
@@ -0,0 +1,176 @@
+"""Stress the rules with adversarial lines, e.g. huge single-line array
+constructors from code generators."""
+
+import math
+import os
+import re
+import time
+
+import pytest
+
+from fortran_linter.cli import main
+from fortran_linter.main import TIMED_LINE_LENGTH, LineChecker, get_rules
+
+# Repeated to build the adversarial lines
+UNITS = [
+    "a",
+    "print",
+    "omp_",
+    "x = omp_",
+    "call omp",
+    "a=",
+    "=",
+    " ",
+    "\t",
+    "!",
+    "!  ",
+    "! !",
+    "!$",
+    "::",
+    "REAL(",
+    "real*",
+    "(kind =",
+    "(\\",
+    "(/1.0e+0,",
+    "write(",
+    "write(*,'",
+    "'\\'",
+    '"\\"',
+    "open(",
+    "print*,",
+    ".eq",
+    "do a=b,",
+    "end",
+]
+
+# Patterns which rescan the rest of the line, up to the next ")", from each
+# occurrence of their prefix: quadratic in the number of occurrences on lines
+# missing the parenthesis. Such lines are bounded by the line timeout.
+RESCANNING = {
+    r"write\s*\(.*\)",
+    r"open\s*\([^\)]+\)",
+    r"\(\\([^\)]*)\\\)",
+    r"\b(REAL|CHARACTER|LOGICAL|INTEGER)(\s*\([^\)]+\))?\s*::",
+}
+
+# Takes seconds to check, as it is quadratic for M004
+SLOW_LINE = "(\\" * 20000 + "\n"
+
+
+def base_rules() -> list[re.Pattern]:
+    patterns = []
+    for rule in get_rules().rules:
+        for regexp, _, _ in rule if isinstance(rule, list) else [rule]:
+            patterns.append(regexp)
+    return patterns
+
+
+def match_time(regexp: re.Pattern, line: str) -> float:
+    best = math.inf
+    for _ in range(3):
+        tstart = time.perf_counter()
+        for _ in regexp.finditer(line):
+            pass
+        best = min(best, time.perf_counter() - tstart)
+    return best
+
+
+@pytest.mark.parametrize("unit", UNITS)
+def test_rules_match_in_linear_time(unit):
+    n = 2000 // len(unit)
+    short, long = unit * n + "\n", unit * (4 * n) + "\n"
+    for regexp in base_rules():
+        if regexp.pattern in RESCANNING:
+            continue
+        # 4 times longer, 16 times slower if quadratic
+        assert match_time(regexp, long) < 8 * match_time(regexp, short) + 1e-3, (
+            regexp.pattern
+        )
+
+
+@pytest.mark.parametrize("whole_file", [True, False])
+def test_line_timeout(whole_file):
+    text = "a=1\n" + SLOW_LINE + "b=2\n"
+    lc = LineChecker("slow.f90", text=text, line_timeout=0.1, whole_file=whole_file)
+    assert lc.corrected_lines == ["a = 1\n", SLOW_LINE, "b = 2\n"]
+    assert [(e.line, e.rule) for e in lc.errors] == [
+        (1, "S009"),
+        (1, "S010"),
+        (2, "T001"),
+        (3, "S009"),
+        (3, "S010"),
+    ]
+    assert lc.errcount == len(lc.errors)
+    assert lc.timed_out
+
+
+def test_file_timeout():
+    text = "a=1\n" + SLOW_LINE + "b=2\n"
+    lc = LineChecker("slow.f90", text=text, file_timeout=0.1)
+    assert lc.corrected_lines == text.splitlines(keepends=True)
+    assert [(e.line, e.rule) for e in lc.errors] == [(1, "T002")]
+    assert lc.errcount == 1
+    assert lc.modifcount == 0
+
+    # Streamed lines are not interrupted, and have already been written
+    text = "a=1\n" + "(\\" * 8000 + "\nb=2\n"
+    lc = LineChecker("slow.f90", stream=True, file_timeout=0.05)
+    lines = list(lc.iter_check(text.splitlines(keepends=True)))
+    assert lines[0][0] == "a = 1\n"
+    assert lines[1][1][-1].rule == "T002"
+    assert lines[2] == ("b=2\n", [])
+    assert lc.kept == {3}
+    assert lc.timed_out
+
+
+def test_timed_lines_do_not_change_results():
+    # Long lines are checked one at a time in whole-file mode
+    fragments = ["a=1", "x = omp_get()", "if(a.eq.b)", "! c", "(\\1\\)", "é", "\t"]
+    lines = [
+        ", ".join(fragments[(i + j) % len(fragments)] for j in range(i % 7 + 1))
+        for i in range(200)
+    ]
+    lines[::10] = [line * (TIMED_LINE_LENGTH // len(line) + 1) for line in lines[::10]]
+    text = "\n".join(lines)
+    whole_file = LineChecker("f.f90", text=text, line_timeout=60)
+    by_line = LineChecker("f.f90", text=text, whole_file=False)
+    assert whole_file.result() == by_line.result()
+    assert not whole_file.timed_out
+
+
+def test_cli_timeouts(tmp_path, capsys):
+    source = tmp_path / "slow.f90"
+    source.write_text("a = 1\n" + SLOW_LINE)
+    cache_dir = tmp_path / "cache"
+    args = [str(source), "--syntax-only", "--format", "gcc"]
+    with pytest.raises(SystemExit):
+        main([*args, "--line-timeout", "0.1", "--cache-dir", str(cache_dir)])
+    out = capsys.readouterr().out
+    assert f"{source}:2:1: warning: Line not checked" in out
+    # Timeouts depend on the load of the machine, they are not cached
+    assert not list(cache_dir.rglob("*.json"))
+
+    with pytest.raises(SystemExit):
+        main([*args, "--line-timeout=-1", "--file-timeout", "0.1", "--no-cache"])
+    out = capsys.readouterr().out
+    assert (
+        out == f"{source}:1:1: warning: File not checked: took more than 0.1 s [T002]\n"
+    )
+
+
+def test_cli_timed_out_lines_are_kept(tmp_path):
+    source = tmp_path / "slow.f90"
+    slow_line = SLOW_LINE.rstrip("\n").encode() + b"  \r\n"
+    source.write_bytes(b"a=1\r\n" + slow_line)
+    with pytest.raises(SystemExit):
+        main([str(source), "-i", "--no-backup", "--line-timeout", "0.1", "--no-cache"])
+    assert source.read_bytes() == f"a = 1{os.linesep}".encode() + slow_line
+
+    # Timed out files are not written at all
+    source.write_bytes(b"a=1\r\n" + slow_line)
+    os.utime(source, (0, 0))
+    with pytest.raises(SystemExit):
+        main([str(source), "-i", "--line-timeout=-1", "--file-timeout", "0.1"])
+    assert source.read_bytes() == b"a=1\r\n" + slow_line
+    assert source.stat().st_mtime == 0
+    assert not source.with_name("slow.f90.orig").exists()
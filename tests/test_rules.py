@@ -0,0 +1,226 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from fortran_linter.main import (
+    REGIONS,
+    Indenter,
+    LineChecker,
+    RuleStats,
+    StatementBuilder,
+    get_rules,
+)
+
+HERE = Path(__file__).parent
+TEST_FILE = str(HERE / "test.f90")
+
+
+def test_rules_are_shared():
+    assert get_rules(120) is get_rules(120)
+    assert get_rules(80) is not get_rules(120)
+    assert get_rules(80).linelen == 80
+
+
+def test_reuse_rules_and_indenter():
+    reference = LineChecker(TEST_FILE)
+
+    indenter = Indenter(4)
+    for _ in range(2):
+        lc = LineChecker(TEST_FILE, rules=get_rules(120), indenter=indenter)
+        assert lc.result() == reference.result()
+
+
+def test_prefilter_does_not_change_results(tmp_path):
+    # Also shuffle fragments of the test files together, to exercise
+    # rules that are triggered by the corrections of other rules
+    rng = random.Random(42)  # noqa: S311
+    fragments = []
+    for fname in ("test.f90", "test_reference.f90"):
+        for line in (HERE / fname).read_text().splitlines():
+            fragments.extend(line.split(" "))
+    lines = [
+        " ".join(rng.choice(fragments) for _ in range(rng.randint(1, 8)))
+        for _ in range(500)
+    ]
+    fuzz_file = tmp_path / "fuzz.f90"
+    fuzz_file.write_text("\n".join(lines) + "\n")
+
+    for fname in (TEST_FILE, str(fuzz_file)):
+        with_prefilter = LineChecker(fname, prefilter=True).result()
+        without_prefilter = LineChecker(fname, prefilter=False).result()
+        assert with_prefilter == without_prefilter
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"skip_regions": frozenset(REGIONS)}, {"line_filter": range(1, 600, 3)}],
+)
+def test_whole_file_does_not_change_results(kwargs):
+    rng = random.Random(7)  # noqa: S311
+    fragments = []
+    for fname in ("test.f90", "test_reference.f90"):
+        for line in (HERE / fname).read_text().splitlines():
+            fragments.extend(line.split(" "))
+    # Corrections removing the newline (empty comments with trailing spaces),
+    # non-ASCII characters and tabs
+    fragments.extend(["!  ", "!$", "x;", "é", "İ", "\t", "#ifdef A\n", "#endif"])
+    text = "\n".join(
+        " ".join(rng.choice(fragments) for _ in range(rng.randint(1, 8)))
+        for _ in range(600)
+    )
+    whole_file = LineChecker("fuzz.f90", text=text, **kwargs)
+    by_line = LineChecker("fuzz.f90", text=text, whole_file=False, **kwargs)
+    assert whole_file.result() == by_line.result()
+
+
+def test_check_only():
+    full = LineChecker(TEST_FILE)
+    check_only = LineChecker(TEST_FILE, check_only=True)
+    assert check_only.corrected_lines == []
+    assert check_only.errors == full.errors
+    assert check_only.modifcount == full.modifcount
+
+
+def test_statement_structure():
+    builder = StatementBuilder()
+    infos = [
+        builder.feed(line)
+        for line in [
+            "module foo\n",
+            "contains\n",
+            "subroutine bar(a, &  ! args\n",
+            "               b)\n",
+            "do i = 1, 2\n",
+            "10 if (a) then\n",
+            "end if\n",
+            "enddo\n",
+            "end subroutine bar\n",
+        ]
+    ]
+    assert [info.scopes for info in infos] == [
+        (),
+        ("module",),
+        ("module",),
+        ("module", "subroutine"),
+        ("module", "subroutine"),
+        ("module", "subroutine", "do"),
+        ("module", "subroutine", "do", "if"),
+        ("module", "subroutine", "do"),
+        ("module", "subroutine"),
+    ]
+    assert builder.scopes == ("module",)
+    assert infos[1].dedents
+    assert infos[2].continues and not infos[2].continued
+    assert infos[3].continued and infos[3].head == "subroutine bar(a, &  "
+    assert infos[4].head is None
+    assert infos[5].label is not None and infos[5].label[0] == "10"
+    assert infos[8].closes
+
+
+def test_skip_rules_apply_to_continuation_lines(tmp_path):
+    fname = tmp_path / "a.f90"
+    fname.write_text(
+        "integer, parameter :: a=1, &\n"
+        "    b=2\n"
+        "write(*, *) 'a', &\n"
+        "    x=1\n"
+        "c = 1 + &\n"
+        "    d=2\n"
+    )
+    lc = LineChecker(str(fname))
+    assert lc.corrected_lines[1] == "    b=2\n"
+    assert lc.corrected_lines[3] == "    x=1\n"
+    assert lc.corrected_lines[5] == "    d = 2\n"
+
+
+def test_regions(tmp_path):
+    fname = tmp_path / "a.f90"
+    fname.write_text(
+        "a=1\n"
+        "! fortran-linter: off\n"
+        "b=2\n"
+        "! fortran-linter: on\n"
+        "#ifdef FOO\n"
+        "c=3\n"
+        "#endif\n"
+        "data x /1,2, &\n"
+        "        3,4/\n"
+        "y = (/ 1,2, &\n"
+        "       3,4 /)\n"
+    )
+    builder = StatementBuilder()
+    regions = [builder.feed(line).regions for line in fname.read_text().splitlines()]
+    assert regions == [
+        (),
+        ("markers",),
+        ("markers",),
+        ("markers",),
+        ("preprocessor",),
+        ("preprocessor",),
+        ("preprocessor",),
+        (),
+        ("data",),
+        (),
+        ("data",),
+    ]
+
+    stats = RuleStats()
+    lc = LineChecker(str(fname), stats=stats)
+    assert lc.corrected_lines[:7] == [
+        "a = 1\n",
+        "! fortran-linter: off\n",
+        "b=2\n",
+        "! fortran-linter: on\n",
+        "#ifdef FOO\n",
+        "c = 3\n",
+        "#endif\n",
+    ]
+    assert lc.corrected_lines[8] == "    3, 4 /\n"
+    assert {error.line for error in lc.errors} == {1, 6, 8, 9, 10, 11}
+    assert stats["<markers region>"].skipped == 3
+
+    stats = RuleStats()
+    lc = LineChecker(
+        str(fname), stats=stats, skip_regions={"markers", "preprocessor", "data"}
+    )
+    assert {error.line for error in lc.errors} == {1, 8, 10}
+    assert lc.corrected_lines[5] == "c=3\n"
+    assert lc.corrected_lines[8] == "        3,4/\n"
+    assert stats["<preprocessor region>"].skipped == 3
+    assert stats["<data region>"].skipped == 2
+
+
+def test_max_errors():
+    full = LineChecker(TEST_FILE)
+    limited = LineChecker(TEST_FILE, max_errors=5)
+    assert limited.errors == full.errors[:5]
+    assert limited.errcount == 5
+    # The corrections are still applied to the whole file
+    assert limited.corrected_lines == full.corrected_lines
+
+    # Checking only, it stops at the first line with 5 errors
+    check_only = LineChecker(TEST_FILE, max_errors=5, check_only=True)
+    assert check_only.errors == full.errors[:5]
+    assert check_only.modifcount < full.modifcount
+
+
+def test_select_ignore():
+    rules = get_rules(120)
+    assert len(set(rules.enabled)) == len(rules.rules)
+    ignored = get_rules(120, ignore=frozenset({"M1", "m005"}))
+    assert "M101" not in ignored.enabled
+    assert "M005" not in ignored.enabled
+    assert len(ignored.rules) == len(rules.rules) - 9
+    # Deselected rules are not compiled
+    assert len(ignored.names) < len(rules.names)
+    assert get_rules(120, select=frozenset({"S00"})).enabled == [
+        f"S00{i}" for i in range(1, 10)
+    ]
+    with pytest.raises(ValueError, match="Unknown rule 'X1'"):
+        get_rules(120, ignore=frozenset({"X1"}))
+
+    full = LineChecker(TEST_FILE)
+    assert {error.rule for error in full.errors} >= {"M002", "S002", "S009"}
+    lc = LineChecker(TEST_FILE, rules=get_rules(120, ignore=frozenset({"M002"})))
+    assert lc.errors == [error for error in full.errors if error.rule != "M002"]
@@ -0,0 +1,107 @@
+import io
+import json
+from pathlib import Path
+
+from fortran_linter.main import LineChecker
+from fortran_linter.server import (
+    INVALID_PARAMS,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    LintServer,
+)
+
+HERE = Path(__file__).parent
+TEST_FILE = HERE / "test.f90"
+
+
+def serve(*requests: str) -> list[dict]:
+    fout = io.StringIO()
+    LintServer().serve(io.StringIO("\n".join(requests) + "\n"), fout)
+    return [json.loads(line) for line in fout.getvalue().splitlines()]
+
+
+def lint_request(req_id: int, **params) -> str:
+    return json.dumps(
+        {"jsonrpc": "2.0", "id": req_id, "method": "lint", "params": params}
+    )
+
+
+def test_lint_matches_checker():
+    (response,) = serve(lint_request(1, text=TEST_FILE.read_text()))
+    assert response["id"] == 1
+    result = response["result"]
+
+    lc = LineChecker(str(TEST_FILE))
+    assert result["corrected"] == "".join(lc.corrected_lines)
+    assert result["errcount"] == lc.errcount == len(result["diagnostics"])
+    for diagnostic, error in zip(result["diagnostics"], lc.errors, strict=True):
+        assert diagnostic["line"] == error.line
+        assert diagnostic["column"] == error.column
+        assert diagnostic["message"] == error.message
+
+
+def test_max_errors():
+    (response,) = serve(lint_request(1, text=TEST_FILE.read_text(), max_errors=3))
+    assert len(response["result"]["diagnostics"]) == 3
+
+
+def test_errors_and_shutdown():
+    responses = serve(
+        "not json",
+        json.dumps({"jsonrpc": "2.0", "id": 1, "method": "unknown"}),
+        json.dumps({"jsonrpc": "2.0", "id": 2, "method": "shutdown"}),
+        lint_request(3, text="a=1\n"),
+    )
+    assert responses[0]["error"]["code"] == PARSE_ERROR
+    assert responses[1]["error"]["code"] == METHOD_NOT_FOUND
+    assert responses[2] == {"jsonrpc": "2.0", "id": 2, "result": None}
+    # Requests after the shutdown are not processed
+    assert len(responses) == 3
+
+
+def test_incremental_document():
+    text = TEST_FILE.read_text()
+    edited = text.replace("comp_iamin", "comp_iamin=1", 1)
+    first, second, third = serve(
+        lint_request(1, text=text, document="buf"),
+        lint_request(2, text=edited, document="buf"),
+        lint_request(3, text=edited),
+    )
+    nlines = len(text.splitlines())
+    assert first["result"]["checked"] == [0, nlines]
+    start, stop = second["result"]["checked"]
+    assert stop - start < nlines
+    assert second["result"]["diagnostics"] == third["result"]["diagnostics"]
+    assert second["result"]["corrected"] == third["result"]["corrected"]
+
+
+def test_form_feed_does_not_shift_lines():
+    text = "a=1\x0c b=2\nc=3\n"
+    first, second = serve(
+        lint_request(1, text=text, document="buf"),
+        lint_request(2, text=text + "d=4\n", document="buf"),
+    )
+    assert {d["line"] for d in first["result"]["diagnostics"]} == {1, 2}
+    assert {d["line"] for d in second["result"]["diagnostics"]} == {1, 2, 3}
+
+
+def test_rule_selection(tmp_path):
+    (tmp_path / "pyproject.toml").write_text('[tool.fortran-linter]\nignore = ["M"]\n')
+    filename = str(tmp_path / "a.f90")
+    text = "if (a.eq.b) a=1\n"
+
+    def rules(response):
+        return {d["rule"] for d in response["result"]["diagnostics"]}
+
+    default, configured, selected, wrong = serve(
+        lint_request(1, text=text),
+        lint_request(2, text=text, filename=filename),
+        # The parameters override the configuration, as on the command line
+        lint_request(3, text=text, filename=filename, select=["M"], ignore=[]),
+        lint_request(4, text=text, ignore=["Z"]),
+    )
+    assert "M101" in rules(default)
+    assert "M101" not in rules(configured)
+    assert rules(configured)
+    assert rules(selected) == {"M101"}
+    assert wrong["error"]["code"] == INVALID_PARAMS
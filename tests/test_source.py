@@ -0,0 +1,68 @@
+import pytest
+
+from fortran_linter import source
+from fortran_linter.cli import main
+from fortran_linter.main import LineChecker
+from fortran_linter.source import iter_lines, read_lines, translate_newline
+
+CONTENTS = [
+    b"",
+    b"a = 1\n",
+    b"a = 1\nb = 2",
+    b"a = 1\r\nb = 2\r\n",
+    b"a = 1\rb = 2\r",
+    b"\n\n",
+    b"a = 1\r\nlong_line = 1 + 2 + 3\r\n\rb\x0cc\n",
+    "x = 'é' ! commentaire\n".encode(),
+]
+
+
+@pytest.mark.parametrize("chunk_size", [source.CHUNK_SIZE, 4])
+@pytest.mark.parametrize("content", CONTENTS)
+def test_read_like_text_mode(tmp_path, monkeypatch, content, chunk_size):
+    monkeypatch.setattr(source, "CHUNK_SIZE", chunk_size)
+    path = tmp_path / "a.f90"
+    path.write_bytes(content)
+    with open(path, encoding="utf-8") as f:
+        expected = f.readlines()
+    assert read_lines(str(path)) == expected
+    assert list(iter_lines(str(path))) == expected
+
+
+@pytest.mark.parametrize("encoding", ["latin-1", "utf-16"])
+def test_encoding(tmp_path, encoding):
+    path = tmp_path / "a.f90"
+    path.write_text("a = 1 ! é\nb = 2\n", encoding=encoding)
+    expected = ["a = 1 ! é\n", "b = 2\n"]
+    assert read_lines(str(path), encoding) == expected
+    assert list(iter_lines(str(path), encoding)) == expected
+
+
+def test_undecodable_bytes_are_kept(tmp_path, capsysbinary):
+    path = tmp_path / "a.f90"
+    path.write_bytes(b"a=1 ! r\xe9sum\xe9\n")
+    lc = LineChecker(str(path))
+    assert lc.corrected_lines == ["a = 1 ! r\udce9sum\udce9\n"]
+
+    with pytest.raises(SystemExit):
+        main([str(path), "--syntax-only", "--no-cache"])
+    out = capsysbinary.readouterr().out
+    assert b" a=1 ! r\xe9sum\xe9\n" in out
+
+    with pytest.raises(SystemExit):
+        main([str(path), "-i", "--no-cache", "--no-backup"])
+    assert path.read_bytes() == b"a = 1 ! r\xe9sum\xe9\n"
+
+    lc = LineChecker(str(path), encoding="latin-1")
+    assert lc.corrected_lines == ["a = 1 ! résumé\n"]
+
+
+@pytest.mark.parametrize("content", CONTENTS)
+def test_read_untranslated(tmp_path, content):
+    path = tmp_path / "a.f90"
+    path.write_bytes(content)
+    with open(path, encoding="utf-8", newline="") as f:
+        expected = f.readlines()
+    assert read_lines(str(path), newline="") == expected
+    assert list(iter_lines(str(path), newline="")) == expected
+    assert [translate_newline(line) for line in expected] == read_lines(str(path))
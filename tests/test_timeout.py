@@ -0,0 +1,49 @@
+import re
+import signal
+import time
+
+import pytest
+
+from fortran_linter.timeout import Deadline, DeadlineError
+
+# Backtracks exponentially on "aaa...": never finishes
+CATASTROPHIC = re.compile(r"(a+)+b")
+
+
+def test_interrupts_a_match():
+    handler = signal.getsignal(signal.SIGALRM)
+    tstart = time.perf_counter()
+    with pytest.raises(DeadlineError) as info, Deadline(0.05) as deadline:
+        CATASTROPHIC.match("a" * 50)
+    assert info.value.deadline is deadline
+    assert time.perf_counter() - tstart < 5
+    assert signal.getsignal(signal.SIGALRM) is handler
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+
+@pytest.mark.parametrize("inner_first", [True, False])
+def test_nested(inner_first):
+    outer_seconds, inner_seconds = (5, 0.05) if inner_first else (0.05, 5)
+    with pytest.raises(DeadlineError) as info:
+        with Deadline(outer_seconds) as outer, Deadline(inner_seconds) as inner:
+            CATASTROPHIC.match("a" * 50)
+    assert info.value.deadline is (inner if inner_first else outer)
+
+
+def test_inner_deadline_keeps_the_outer_one():
+    with pytest.raises(DeadlineError) as info, Deadline(0.1) as outer:
+        with Deadline(5):
+            pass
+        CATASTROPHIC.match("a" * 50)
+    assert info.value.deadline is outer
+
+
+def test_late_block_fails():
+    with pytest.raises(DeadlineError), Deadline(0.01):
+        time.sleep(0.05)
+
+
+def test_no_limit():
+    with Deadline(-1) as deadline:
+        deadline.check()
+    assert not deadline.expired